@@ -18,6 +18,7 @@ requirements = [
     'sendgrid',
     'babelfish',
     'numpy',
+    'scipy',
     'turicreate',
     'IMDbPY',
     'subliminal',
@@ -31,6 +32,8 @@ requirements = [
     'python-Levenshtein',
     'scikit-learn>=0.20.1'
 ]
+extras_requirements = {'speedup': ['rapidfuzz'], 'parquet': ['pyarrow']}
+
 setup_requirements = ['pytest-runner', ]
 
 test_requirements = ['pytest', ]
@@ -48,6 +51,7 @@ setup(
     ],
     description="Python Boilerplate contains all the boilerplate you need to create a Python package.",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="Apache Software License 2.0",
     long_description=readme,
     include_package_data=True,
@@ -86,10 +86,7 @@ def get_female_in_top_10_roles():
 
 def get_relationship_triangles():
     triangles = SFrame.read_csv(f"{OUTPUT_PATH}/triangles.csv", usecols=["0", "1", "2", "3", "4"])
-    triangles_gender = triangles.apply(
-        lambda x: [imdb_data.get_actor_gender(x["0"]), imdb_data.get_actor_gender(x["1"]),
-                   imdb_data.get_actor_gender(x["2"])])
-    triangles_gender = triangles_gender.unpack()
+    triangles_gender = SFrame({f"X.{i}": list(imdb_data.get_actors_gender(triangles[str(i)])) for i in range(3)})
     triangles_gender["movie"] = triangles["3"]
     triangles_gender["year"] = triangles["4"]
     triangles_gender = triangles_gender.dropna()
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from imdb.Character import Character
+from imdb.Person import Person
+
+from subs2network.consts import IMDB_CAST, IMDB_NAME, CAST_RECORD_SUFFIX, CAST_RECORDS_CACHE_SIZE
+from subs2network.utils import to_iterable
+
+# bump when the record format changes, records with a different version are rebuilt
+CAST_RECORD_VERSION = 1
+# suffix of the pickled IMDb movies saved by previous versions
+LEGACY_ROLES_SUFFIX = "roles.pkl"
+
+# LRU cache of the loaded cast records
+_cast_records = OrderedDict()
+_cast_records_lock = threading.Lock()
+
+
+def get_cast_record_path(roles_path):
+    """
+    Return the path of the cast record which replaces the roles path's pickled IMDb movie
+    :param roles_path: the video's roles path
+    :rtype: str
+    """
+    if roles_path.endswith(LEGACY_ROLES_SUFFIX):
+        return roles_path[:-len(LEGACY_ROLES_SUFFIX)] + CAST_RECORD_SUFFIX
+    return roles_path
+
+
+def get_legacy_roles_path(roles_path):
+    """
+    Return the path of the IMDb movie pickled by previous versions in place of the video's cast record
+    :param roles_path: the video's roles path
+    :rtype: str
+    """
+    if roles_path.endswith(CAST_RECORD_SUFFIX):
+        return roles_path[:-len(CAST_RECORD_SUFFIX)] + LEGACY_ROLES_SUFFIX
+    return roles_path
+
+
+def _cache_cast_record(path, record):
+    with _cast_records_lock:
+        _cast_records[path] = record
+        _cast_records.move_to_end(path)
+        while len(_cast_records) > CAST_RECORDS_CACHE_SIZE:
+            _cast_records.popitem(last=False)
+
+
+def movie_to_cast_record(imdb_id, imdb_movie):
+    """
+    Convert an IMDbPY movie to a cast record, which holds only the movie's details used to identify the roles
+    :param imdb_id: the movie's IMDB id
+    :param imdb_movie: IMDbPY Movie object
+    :return: cast record dict
+    :rtype: dict
+    """
+    cast = None
+    if IMDB_CAST in imdb_movie.keys():
+        cast = []
+        for i, p in enumerate(imdb_movie[IMDB_CAST]):
+            roles = [{"id": role.getID(), "name": role.get(IMDB_NAME), "notes": role.notes}
+                     for role in to_iterable(p.currentRole) if role is not None]
+            cast.append({"id": p.getID(), "name": p.get(IMDB_NAME), "order": i, "notes": p.notes, "roles": roles,
+                         "roles_list": isinstance(p.currentRole, list)})
+    return {"version": CAST_RECORD_VERSION, "imdb_id": str(imdb_id), "rating": imdb_movie.data.get("rating"),
+            "cast": cast}
+
+
+def cast_record_to_cast_list(record):
+    """
+    Rebuild the IMDbPY cast list of a cast record
+    :param record: cast record dict
+    :return: list of Person objects, ordered by their billing order, or None if the record has no cast
+    :rtype: list of Person
+    """
+    if record["cast"] is None:
+        return None
+    cast_list = []
+    for p in sorted(record["cast"], key=lambda c: c["order"]):
+        roles = [Character(name=r["name"], characterID=r["id"], notes=r["notes"]) for r in p["roles"]]
+        if not p["roles_list"]:
+            roles = roles[0] if roles else ""
+        cast_list.append(Person(name=p["name"], personID=p["id"], notes=p["notes"], currentRole=roles,
+                                billingPos=p["order"] + 1))
+    return cast_list
+
+
+def save_cast_record(roles_path, record):
+    """
+    Save the cast record as JSON
+    :param roles_path: the video's roles path
+    :param record: cast record dict
+    """
+    path = get_cast_record_path(roles_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    _cache_cast_record(path, record)
+
+
+def load_cast_record(roles_path):
+    """
+    Load the video's cast record, from the in memory cache if it was recently loaded. IMDb movies pickled by previous
+    versions next to the cast record's path are converted to cast records on their first load
+    :param roles_path: the video's roles path
+    :return: cast record dict or None if the video has no cast record
+    :rtype: dict
+    """
+    path = get_cast_record_path(roles_path)
+    with _cast_records_lock:
+        if path in _cast_records:
+            _cast_records.move_to_end(path)
+            return _cast_records[path]
+    record = _read_cast_record(path)
+    legacy_path = get_legacy_roles_path(path)
+    if record is None and os.path.exists(legacy_path):
+        with open(legacy_path, "rb") as f:
+            imdb_movie = pickle.load(f)
+        logging.debug(f"Converting {legacy_path} to a cast record")
+        record = movie_to_cast_record(imdb_movie.movieID, imdb_movie)
+        save_cast_record(path, record)
+        os.remove(legacy_path)
+    if record is not None:
+        _cache_cast_record(path, record)
+    return record
+
+
+def _read_cast_record(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            record = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if record.get("version") != CAST_RECORD_VERSION:
+        return None
+    return record
+
+
+def warm_cast_records(roles_paths, n_threads=8):
+    """
+    Load the cast records of many videos into the in memory cache, so the videos' roles analyzers don't read them
+    from disk one by one. Only the first CAST_RECORDS_CACHE_SIZE videos are loaded, as the cache can't hold more
+    :param roles_paths: iterable of the videos' roles paths, in the order the videos are analyzed
+    :param n_threads: number of threads reading the records
+    :return: dict from the IMDB id to the cast record of each loaded video
+    :rtype: dict
+    """
+    with ThreadPoolExecutor(n_threads) as executor:
+        records = executor.map(load_cast_record, islice(roles_paths, CAST_RECORDS_CACHE_SIZE))
+        return {r["imdb_id"]: r for r in records if r is not None}
@@ -53,10 +53,32 @@ if not os.path.exists(BASEPATH):
 
 OUTPUT_PATH = f"{BASEPATH}/output"
 DATA_PATH = f"{BASEPATH}/data"
+NER_CACHE_PATH = f"{BASEPATH}/ner_cache"
+SUBTITLE_INDEX_NAME = "subtitles_index.sqlite"
+CAST_RECORD_SUFFIX = "cast.json"
+CAST_RECORDS_CACHE_SIZE = 1024
+GRAPH_BINARY_EXTENSION = "s2ng"
+CORPUS_STORE_NAME = "corpus.sqlite"
+SAVE_GRAPH_FILES = os.getenv("SAVE_GRAPH_FILES", "0") == "1"
+IMDB_CAST_INDEX_PATH = f"{DATA_PATH}/imdb_cast_index.sqlite"
+IMDB_DATASETS_PATH = f"{DATA_PATH}/imdb"
+IMDB_OFFLINE = os.getenv("IMDB_OFFLINE", "0") == "1"
 STANFORD_NLP_MODEL = f"{BASEPATH}/ner/english.all.3class.distsim.crf.ser.gz"
 STANFORD_NLP_JAR = f"{BASEPATH}/ner/stanford-ner.jar"
 STANFORD_NLP_JAR_URL = "https://github.com/data4goodlab/subs2network/raw/master/ner/stanford-ner.jar"
 STANFORD_NLP_MODEL_URL = "https://github.com/data4goodlab/subs2network/raw/master/ner/classifiers/english.all.3class.distsim.crf.ser.gz"
+STANFORD_NER_POOL_SIZE = int(os.getenv("STANFORD_NER_POOL_SIZE", 1))
+STANFORD_NER_MEMORY = "1000m"
+STANFORD_NER_STARTUP_TIMEOUT = 120
+SPACY_MODEL = "en_core_web_sm"
+SPACY_BATCH_SIZE = 256
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", 1))
+MATCH_ROLES_CACHE_SIZE = 4096
+CENTRALITY_SAMPLING_THRESHOLD = 1000
+CENTRALITY_SAMPLING_EPSILON = 0.1
+CENTRALITY_SAMPLING_SEED = 0
+CLIQUE_TIME_BUDGET = 10
+CLIQUE_NODE_BUDGET = 5000
 DEBUG = True
 
 
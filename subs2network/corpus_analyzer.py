@@ -0,0 +1,205 @@
+import csv
+import logging
+import multiprocessing
+import traceback
+
+from tqdm import tqdm
+
+from subs2network.corpus_store import get_corpus_store
+from subs2network.graph_binary import load_graph, BinaryGraph
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _ARROW_TYPES = {str: pa.string, int: pa.int64, float: pa.float64, bool: pa.bool_}
+except ImportError:
+    pa = None
+
+
+class Analysis(object):
+    """
+    A graph analysis and the columns of the result rows it returns
+    """
+
+    def __init__(self, func, columns, binary=False):
+        """
+        :param func: module level function which receives a graph and returns an iterable of result rows (dicts)
+        :param columns: list of (column name, type) tuples of the rows' columns, the type is str, int, float or bool
+        :param binary: the function accepts BinaryGraphs as well as networkx graphs, so the graphs aren't converted
+        """
+        self._func = func
+        self._columns = columns
+        self._binary = binary
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def binary(self):
+        return self._binary
+
+    def __call__(self, g):
+        return self._func(g)
+
+
+def _check_columns(rows, columns, path):
+    columns = set(columns)
+    for row in rows:
+        unknown = [k for k in row if k not in columns]
+        if unknown:
+            raise ValueError(f"{path}: the rows have columns which weren't declared {unknown}")
+
+
+class CsvResultsWriter(object):
+    """
+    Appends result rows to a CSV file as they arrive, rows with undeclared columns raise ValueError
+    """
+
+    def __init__(self, path, columns, index=False):
+        """
+        :param path: the CSV's path
+        :param columns: list of (column name, type) tuples
+        :param index: write a running row number as the first (unnamed) column, as pandas' to_csv does
+        """
+        self._path = path
+        self._columns = [name for name, t in columns]
+        self._f = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._f, ([""] if index else []) + self._columns)
+        self._writer.writeheader()
+        self._index = index
+        self._rows_count = 0
+
+    def write(self, rows):
+        if not rows:
+            return
+        _check_columns(rows, self._columns, self._path)
+        for row in rows:
+            if self._index:
+                row = dict(row)
+                row[""] = self._rows_count
+            self._writer.writerow(row)
+            self._rows_count += 1
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class ParquetResultsWriter(object):
+    """
+    Appends result rows to a Parquet file as row groups, rows with undeclared columns raise ValueError
+    """
+
+    def __init__(self, path, columns, index=False):
+        """
+        :param path: the Parquet file's path
+        :param columns: list of (column name, type) tuples
+        :param index: unused, Parquet files have no index column
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required to write Parquet files, "
+                              "install it with: pip install subs2network[parquet]")
+        self._path = path
+        self._columns = [name for name, t in columns]
+        self._schema = pa.schema([(name, _ARROW_TYPES[t]()) for name, t in columns])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        _check_columns(rows, self._columns, self._path)
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def get_results_writer(path, columns, index=False):
+    """
+    Return a results writer according to the path's extension, .parquet or CSV
+    :param path: the output path
+    :param columns: list of (column name, type) tuples
+    :param index: add a running row number column (CSV only)
+    """
+    if path.endswith(".parquet"):
+        return ParquetResultsWriter(path, columns)
+    return CsvResultsWriter(path, columns, index)
+
+
+def _analyze_graph(args):
+    graph, analyses, store_output_path = args
+    try:
+        if store_output_path is not None:
+            g = get_corpus_store(store_output_path).get_graph_binary(graph)
+        else:
+            g = load_graph(graph, as_binary=True)
+        nx_graph = None
+        res = {}
+        for name, analysis in analyses.items():
+            if analysis.binary or not isinstance(g, BinaryGraph):
+                res[name] = list(analysis(g))
+            else:
+                # converted once, for all the analyses which need a networkx graph
+                if nx_graph is None:
+                    nx_graph = g.to_networkx()
+                res[name] = list(analysis(nx_graph))
+        return res
+    except Exception:
+        logging.error(graph)
+        logging.error(traceback.format_exc())
+        return {}
+
+
+class CorpusAnalyzer(object):
+    """
+    Runs several analyses over a corpus of graphs, stored in a corpus store or as JSON files. Each graph is loaded once
+    as a BinaryGraph, when it has a binary encoding, and is converted to a networkx graph only for the analyses which
+    need one. The graphs are sharded across a process pool and the result rows are written as soon as each graph is
+    analyzed
+    """
+
+    def __init__(self, analyses, n_workers=1, chunksize=4):
+        """
+        :param analyses: dict from analysis name to its Analysis
+        :param n_workers: number of worker processes (1 - analyze the graphs in the current process)
+        :param chunksize: number of graphs sent to a worker at a time
+        """
+        self._analyses = analyses
+        self._n_workers = n_workers
+        self._chunksize = chunksize
+
+    def run(self, graphs, outputs, indexed=(), store_output_path=None):
+        """
+        Analyze all the graphs
+        :param graphs: iterable of the graphs' corpus store ids, or of their JSON paths, loaded from their binary files
+        when they have ones, if store_output_path is None
+        :param outputs: dict from analysis name to its output path (.csv or .parquet)
+        :param indexed: names of the analyses whose CSV output starts with a running row number column
+        :param store_output_path: the output directory of the corpus store which holds the graphs
+        :return: dict from analysis name to the number of written rows
+        :rtype: dict
+        """
+        writers = {name: get_results_writer(outputs[name], analysis.columns, name in indexed)
+                   for name, analysis in self._analyses.items()}
+        rows_count = {name: 0 for name in self._analyses}
+        tasks = ((g, self._analyses, store_output_path) for g in graphs)
+        try:
+            if self._n_workers > 1:
+                with multiprocessing.Pool(self._n_workers) as pool:
+                    for res in tqdm(pool.imap(_analyze_graph, tasks, chunksize=self._chunksize)):
+                        self._write(writers, rows_count, res)
+            else:
+                for res in tqdm(map(_analyze_graph, tasks)):
+                    self._write(writers, rows_count, res)
+        finally:
+            for w in writers.values():
+                w.close()
+        return rows_count
+
+    @staticmethod
+    def _write(writers, rows_count, res):
+        for name, rows in res.items():
+            writers[name].write(rows)
+            rows_count[name] += len(rows)
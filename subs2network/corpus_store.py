@@ -0,0 +1,249 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import networkx as nx
+
+from subs2network.consts import VIDEO_NAME, MOVIE_YEAR, CORPUS_STORE_NAME
+from subs2network.graph_binary import load_graph, dumps_graph_binary, loads_graph_binary
+
+NODES_COLUMNS = ("role", "gender", "first", "last")
+EDGES_COLUMNS = ("weight", "first", "last")
+
+
+class CorpusStore(object):
+    """
+    SQLite store of all the generated graphs. Each graph is a video row, and its nodes and edges are rows of the
+    nodes and edges tables with the video's id. The video row also holds the graph's binary encoding, which the
+    analyses load without parsing the graph. Actors and directors are linked to the videos of their movies, so their
+    views are queries over the store instead of copies of the movies' outputs
+    """
+
+    def __init__(self, path):
+        """
+        Open the store, creating it if needed
+        :param path: path to the store's SQLite file
+        """
+        self._path = path
+        # sqlite connections can't be shared between threads or forked processes
+        self._local = threading.local()
+        with self._get_connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS videos (video_id INTEGER PRIMARY KEY, data_type TEXT NOT NULL, "
+                         "name TEXT NOT NULL, video_name TEXT NOT NULL, movie_year INTEGER, graph TEXT, "
+                         "updated REAL, graph_binary BLOB, UNIQUE (data_type, name, video_name))")
+            # stores created before the graphs' binary encodings were added
+            if "graph_binary" not in [r[1] for r in conn.execute("PRAGMA table_info(videos)")]:
+                conn.execute("ALTER TABLE videos ADD COLUMN graph_binary BLOB")
+            conn.execute("CREATE TABLE IF NOT EXISTS nodes (video_id INTEGER NOT NULL, node TEXT NOT NULL, "
+                         "role TEXT, gender TEXT, first REAL, last REAL, PRIMARY KEY (video_id, node))")
+            conn.execute("CREATE TABLE IF NOT EXISTS edges (video_id INTEGER NOT NULL, src TEXT NOT NULL, "
+                         "dst TEXT NOT NULL, weight NUMERIC, first REAL, last REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS edges_video_id ON edges (video_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS people (person_type TEXT NOT NULL, person_name TEXT NOT NULL, "
+                         "video_id INTEGER NOT NULL, PRIMARY KEY (person_type, person_name, video_id))")
+            conn.execute("CREATE TABLE IF NOT EXISTS metadata (data_type TEXT NOT NULL, name TEXT NOT NULL, "
+                         "data TEXT, PRIMARY KEY (data_type, name))")
+
+    def _get_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put_graph(self, g, data_type, name):
+        """
+        Add the graph to the store, replacing the nodes and edges of a previously stored graph of the same video
+        :param g: networkx graph with the video's name in its attributes
+        :param data_type: the graph's output type, such as movies or series
+        :param name: the graph's output name, such as the movie's title or the series' name
+        :return: the video's id
+        :rtype: int
+        """
+        video_name = g.graph[VIDEO_NAME]
+        with self._get_connection() as conn:
+            row = conn.execute("SELECT video_id FROM videos WHERE data_type=? AND name=? AND video_name=?",
+                               (data_type, name, video_name)).fetchone()
+            values = (g.graph.get(MOVIE_YEAR), json.dumps(g.graph), time.time(), dumps_graph_binary(g))
+            if row is None:
+                video_id = conn.execute("INSERT INTO videos (data_type, name, video_name, movie_year, graph, updated, "
+                                        "graph_binary) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                        (data_type, name, video_name) + values).lastrowid
+            else:
+                video_id = row[0]
+                conn.execute("UPDATE videos SET movie_year=?, graph=?, updated=?, graph_binary=? WHERE video_id=?",
+                             values + (video_id,))
+                conn.execute("DELETE FROM nodes WHERE video_id=?", (video_id,))
+                conn.execute("DELETE FROM edges WHERE video_id=?", (video_id,))
+            conn.executemany("INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?)",
+                             ((video_id, v) + tuple(d.get(k) for k in NODES_COLUMNS) for v, d in g.nodes(data=True)))
+            conn.executemany("INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?)",
+                             ((video_id, v, u) + tuple(d.get(k) for k in EDGES_COLUMNS)
+                              for v, u, d in g.edges(data=True)))
+        return video_id
+
+    def import_json_graphs(self, data_type, name, json_paths):
+        """
+        Add graphs which were saved only as node link JSON files to the store
+        :param data_type: the graphs' output type
+        :param name: the graphs' output name
+        :param json_paths: iterable of the graphs' JSON paths
+        :return: the graphs' video ids
+        :rtype: list
+        """
+        return [self.put_graph(load_graph(p), data_type, name) for p in json_paths]
+
+    def get_video_ids(self, data_type, name):
+        """
+        :param data_type: the graphs' output type
+        :param name: the graphs' output name
+        :return: the ids of the stored graphs of the output, such as a movie's roles and actors graphs
+        :rtype: list
+        """
+        rows = self._get_connection().execute("SELECT video_id FROM videos WHERE data_type=? AND name=? "
+                                              "ORDER BY video_id", (data_type, name)).fetchall()
+        return [r[0] for r in rows]
+
+    def put_metadata(self, data_type, name, metadata):
+        """
+        Save the output's metadata, such as the movie's IMDb details, replacing its previous metadata
+        :param data_type: the output's type
+        :param name: the output's name
+        :param metadata: JSON serializable metadata
+        """
+        with self._get_connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?)", (data_type, name, json.dumps(metadata)))
+
+    def get_metadata(self, data_type, name):
+        """
+        :param data_type: the output's type
+        :param name: the output's name
+        :return: the output's metadata or None if it has no metadata
+        """
+        row = self._get_connection().execute("SELECT data FROM metadata WHERE data_type=? AND name=?",
+                                             (data_type, name)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def add_person_videos(self, person_type, person_name, video_ids):
+        """
+        Link the person to the videos
+        :param person_type: actors or directors
+        :param person_name: the person's name
+        :param video_ids: iterable of the videos' ids
+        """
+        with self._get_connection() as conn:
+            conn.executemany("INSERT OR IGNORE INTO people VALUES (?, ?, ?)",
+                             ((person_type, person_name, video_id) for video_id in video_ids))
+
+    def get_people(self, person_type):
+        """
+        :param person_type: actors or directors
+        :return: the names of the people of the type which are linked to videos
+        :rtype: list
+        """
+        rows = self._get_connection().execute("SELECT DISTINCT person_name FROM people WHERE person_type=? "
+                                              "ORDER BY person_name", (person_type,)).fetchall()
+        return [r[0] for r in rows]
+
+    def get_videos(self, data_type=None, person_type=None, person_name=None, name=None):
+        """
+        Query the stored videos
+        :param data_type: return only the videos of the output type (None - all types)
+        :param person_type: return only the videos linked to a person of the type (None - all videos)
+        :param person_name: the linked person's name
+        :param name: return only the videos of the output name (None - all names)
+        :return: list of dicts with the video's id, output type, output name, video name and year
+        :rtype: list of dict
+        """
+        query = "SELECT v.video_id, v.data_type, v.name, v.video_name, v.movie_year FROM videos v"
+        conditions, params = [], []
+        if person_type is not None:
+            query += " JOIN people p ON v.video_id = p.video_id"
+            conditions += ["p.person_type=?", "p.person_name=?"]
+            params += [person_type, person_name]
+        if data_type is not None:
+            conditions.append("v.data_type=?")
+            params.append(data_type)
+        if name is not None:
+            conditions.append("v.name=?")
+            params.append(name)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = self._get_connection().execute(query + " ORDER BY v.video_id", params).fetchall()
+        return [{"video_id": r[0], "data_type": r[1], "name": r[2], VIDEO_NAME: r[3], MOVIE_YEAR: r[4]}
+                for r in rows]
+
+    def get_graph(self, video_id):
+        """
+        :param video_id: the video's id
+        :return: the video's graph or None if the video isn't stored
+        :rtype: nx.Graph
+        """
+        conn = self._get_connection()
+        row = conn.execute("SELECT graph FROM videos WHERE video_id=?", (video_id,)).fetchone()
+        if row is None:
+            return None
+        g = nx.Graph()
+        g.graph.update(json.loads(row[0]))
+        for r in conn.execute(f"SELECT node, {', '.join(NODES_COLUMNS)} FROM nodes WHERE video_id=?",
+                              (video_id,)):
+            g.add_node(r[0], **{k: v for k, v in zip(NODES_COLUMNS, r[1:]) if v is not None})
+        for r in conn.execute(f"SELECT src, dst, {', '.join(EDGES_COLUMNS)} FROM edges WHERE video_id=? "
+                              f"ORDER BY rowid", (video_id,)):
+            g.add_edge(r[0], r[1], **{k: v for k, v in zip(EDGES_COLUMNS, r[2:]) if v is not None})
+        return g
+
+    def get_graph_binary(self, video_id):
+        """
+        :param video_id: the video's id
+        :return: the video's graph as a BinaryGraph, whose columns are views over the stored encoding, or None if the
+        video isn't stored
+        :rtype: BinaryGraph
+        """
+        row = self._get_connection().execute("SELECT graph_binary FROM videos WHERE video_id=?",
+                                             (video_id,)).fetchone()
+        if row is None:
+            return None
+        data = row[0]
+        if data is None:
+            # videos stored before the graphs' binary encodings were added
+            data = dumps_graph_binary(self.get_graph(video_id))
+            with self._get_connection() as conn:
+                conn.execute("UPDATE videos SET graph_binary=? WHERE video_id=?", (data, video_id))
+        return loads_graph_binary(data)
+
+    def iter_graphs(self, data_type=None, person_type=None, person_name=None):
+        """
+        :return: generator of the graphs of the videos which match the query, see get_videos
+        """
+        for v in self.get_videos(data_type, person_type, person_name):
+            yield self.get_graph(v["video_id"])
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_corpus_store(output_path):
+    """
+    Return the corpus store of an output directory, the store is shared by all the creators in the process
+    :param output_path: the directory the graphs are saved to
+    :rtype: CorpusStore
+    """
+    path = os.path.abspath(os.path.join(output_path, CORPUS_STORE_NAME))
+    with _stores_lock:
+        if path not in _stores:
+            os.makedirs(output_path, exist_ok=True)
+            _stores[path] = CorpusStore(path)
+        return _stores[path]
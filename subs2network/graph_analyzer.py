@@ -6,75 +6,57 @@ import networkx as nx
 import pandas as pd
 
 from subs2network.utils import add_prefix_to_dict_keys
+from subs2network.corpus_analyzer import CorpusAnalyzer, Analysis
+from subs2network.corpus_store import get_corpus_store
+from subs2network.graph_features import GraphFeatures, iter_triangles, clique_number
 from subs2network.imdb_dataset import imdb_data
-from subs2network.consts import MOVIE_YEAR
+from subs2network.consts import MOVIE_YEAR, VIDEO_NAME, OUTPUT_PATH, CENTRALITY_SAMPLING_THRESHOLD, \
+    CENTRALITY_SAMPLING_EPSILON, CENTRALITY_SAMPLING_SEED, CLIQUE_TIME_BUDGET, CLIQUE_NODE_BUDGET
 
 
 def get_node_features(g):
-    closeness = nx.closeness_centrality(g)
-    betweenness = nx.betweenness_centrality(g)
+    features = GraphFeatures(g)
+    closeness = features.to_dict(features.closeness())
+    betweenness = features.to_dict(features.betweenness())
     betweenness_weight = nx.betweenness_centrality(g, weight="weight")
     degree_centrality = nx.degree_centrality(g)
-    pr = nx.pagerank(g, weight=None)
-    pr_weight = nx.pagerank(g, weight="weight")
-    clustering = nx.clustering(g)
+    pr = features.to_dict(features.pagerank(weight=None))
+    pr_weight = features.to_dict(features.pagerank(weight="weight"))
+    clustering = features.to_dict(features.clustering())
+    genders = dict(zip(g.nodes(), imdb_data.get_actors_gender(g.nodes())))
     for v in g.nodes():
         res = {"total_weight": g.degree(v, weight="weight"), "degree": g.degree(v), "movie_name": g.graph["movie_name"],
                "year": g.graph["movie_year"], "imdb_rating": g.graph["imdb_rating"], "closeness": closeness[v],
                "betweenness_weight": betweenness_weight[v], "betweenness": betweenness[v],
                "degree_centrality": degree_centrality[v], "clustering": clustering[v], "pagerank": pr[v],
-               "pr_weight": pr_weight[v], "gender": imdb_data.get_actor_gender(v), "name": v}
+               "pr_weight": pr_weight[v], "gender": genders[v], "name": v}
         yield res
 
 
 def get_actor_features(g, actor):
-    res = {}
-    closeness = nx.closeness_centrality(g)
-    betweenness = nx.betweenness_centrality(g)
-    betweenness_weight = nx.betweenness_centrality(g, weight="weight")
-    degree_centrality = nx.degree_centrality(g)
-    clustering = nx.clustering(g)
-    pr = nx.pagerank(g, weight=None)
-    pr_weight = nx.pagerank(g)
-
-    v = actor
-    res["total_weight"] = g.degree(v, weight="weight")
-    res["degree"] = g.degree(v)
-    res["closeness"] = closeness[v]
-    res["betweenness"] = betweenness[v]
-    res["betweenness_weight"] = betweenness_weight[v]
-    res["degree_centrality"] = degree_centrality[v]
-    res["clustering"] = clustering[v]
-    res["movie_rating"] = g.graph["imdb_rating"]
-    res["pagerank"] = pr[v]
-    res["pagerank_weight"] = pr_weight[v]
+    features = GraphFeatures(g)
+    v = features.nodes.index(actor)
+    res = {"total_weight": g.degree(actor, weight="weight"), "degree": g.degree(actor),
+           "closeness": features.closeness()[v], "betweenness": features.betweenness()[v],
+           "betweenness_weight": nx.betweenness_centrality(g, weight="weight")[actor],
+           "degree_centrality": nx.degree_centrality(g)[actor], "clustering": features.clustering()[v],
+           "movie_rating": g.graph["imdb_rating"], "pagerank": features.pagerank(weight=None)[v],
+           "pagerank_weight": features.pagerank(weight="weight")[v]}
 
     # res["gender"] = imdb_data.get_actor_gender(v)
     return res
 
 
 def average_graph_weight(g):
-    stats = pd.Series(list(nx.get_edge_attributes(g, "weight").values())).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "weight")
+    return describe_values(list(nx.get_edge_attributes(g, "weight").values()), "weight")
 
 
 def average_graph_degree(g):
-    stats = pd.Series([d for n, d in nx.degree(g, g.nodes())]).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "degree")
+    return describe_values([d for n, d in nx.degree(g, g.nodes())], "degree")
 
 
 def average_actor_appearance(g):
-    stats = pd.Series([g.degree(v, weight="weight") for v in g.nodes()]).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "appearance")
-
-
-def average_closeness_centrality(g):
-    stats = pd.Series(list(nx.closeness_centrality(g).values())).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "closeness")
+    return describe_values([g.degree(v, weight="weight") for v in g.nodes()], "appearance")
 
 
 def average_eigenvector_centrality(g):
@@ -83,46 +65,9 @@ def average_eigenvector_centrality(g):
     return add_prefix_to_dict_keys(stats.to_dict(), "eigenvector")
 
 
-def average_betweenness_centrality(g):
-    stats = pd.Series(list(nx.betweenness_centrality(g).values())).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "betweenness")
-
-
-def average_pagerank(g):
-    stats = pd.Series(list(nx.nx.pagerank(g, weight=None).values())).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "pagerank")
-
-
-def average_weighted_pagerank(g):
-    stats = pd.Series(list(nx.nx.pagerank(g, weight="weight").values())).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "weighted_pagerank")
-
-
-def average_weighted_betweenness_centrality(g):
-    stats = pd.Series(list(nx.betweenness_centrality(g).values())).describe()
-    del stats["count"]
-    return add_prefix_to_dict_keys(stats.to_dict(), "weighted_betweenness")
-
-
-def average_clustering(g):
-    try:
-        return {"average_clustering": nx.average_clustering(g)}
-    except:
-        return {"average_clustering": 0}
-
-
-def average_weighted_clustering(g):
-    try:
-        return {"average_weighted_clustering": nx.average_clustering(g, weight="weight")}
-    except:
-        return {"average_clustering": 0}
-
-
-def graph_clique_number(g):
-    return {"clique_number": nx.graph_clique_number(g)}
+def graph_clique_number(g, time_budget=CLIQUE_TIME_BUDGET, node_budget=CLIQUE_NODE_BUDGET):
+    lower, upper, exact = clique_number(g, time_budget, node_budget)
+    return {"clique_number": lower, "clique_number_upper_bound": upper, "clique_number_exact": exact}
 
 
 def average_degree_connectivity(g):
@@ -137,116 +82,171 @@ def get_node_number(g):
     return {"node_number": len(g.node)}
 
 
-def analyze_movies():
-    p = "../temp/movies/"
-    res = []
-    for movie in tqdm(os.listdir(p)):
-        path = os.path.join(p, movie)
-        g_pth = os.path.join(path, f"json/{movie}.json")
-        if not os.path.exists(g_pth):
-            g_pth = glob.glob(os.path.join(path, f"json/*.json"))
-            if g_pth:
-                g_pth = g_pth[0]
-        if g_pth:
-            # try:
-            with open(g_pth) as f:
-                g = json_graph.node_link_graph(json.load(f))
-                if g.number_of_nodes() == 0:
-                    continue
-                d = extract_graph_features(g)
-            #
-            # with open(os.path.join(path, f"{movie}.json")) as f:
-            #     movie_info = json.load(f)
-            #     d.update(json.loads(movie_info))
-            res.append(d)
-            # except:
-            #     pass
-        # else:
-        #     print(movie)
-    pd.DataFrame(res).to_csv(f"../temp//graph_features.csv", index=False)
+def get_movies_video_ids(roles=False):
+    """
+    Return the corpus store ids of the movies' graphs, the graphs of movies which were saved only as JSON files are
+    added to the store first
+    :param roles: return the movies' roles graphs instead of their main graphs
+    :rtype: list
+    """
+    store = get_corpus_store(OUTPUT_PATH)
+    movies_path = os.path.join(OUTPUT_PATH, "movies")
+    if os.path.isdir(movies_path):
+        stored = {v["name"] for v in store.get_videos("movies")}
+        for movie in os.listdir(movies_path):
+            if movie not in stored:
+                json_paths = glob.glob(os.path.join(movies_path, movie, "json", "*.json"))
+                store.import_json_graphs("movies", movie, json_paths)
+    return [v["video_id"] for v in store.get_videos("movies") if v[VIDEO_NAME].endswith(" - roles") == roles]
+
+
+def graph_features_analysis(g):
+    if g.number_of_nodes() == 0:
+        return []
+    return [extract_graph_features(g)]
+
+
+def node_features_analysis(g):
+    if g.number_of_nodes() > 5:
+        return get_node_features(g)
+    return []
+
+
+def triangles_analysis(g):
+    movie_name = g.graph["movie_name"].replace(" - roles", "")
+    for t in iter_triangles(g):
+        yield {"0": t[0], "1": t[1], "2": t[2], "3": movie_name, "4": g.graph["movie_year"]}
+
+
+DESCRIBE_STATS = ("mean", "std", "min", "25%", "50%", "75%", "max")
+
+
+def describe_columns(prefix):
+    """
+    :param prefix: the described values' prefix
+    :return: the columns of the values' describe_values statistics
+    :rtype: list
+    """
+    return [(f"{prefix}-{stat}", float) for stat in DESCRIBE_STATS]
+
+
+GRAPH_FEATURES_COLUMNS = [("edge_number", int), ("node_number", int)] + describe_columns("appearance") + \
+                         describe_columns("closeness") + \
+                         [("average_clustering", float), ("average_weighted_clustering", float)] + \
+                         describe_columns("betweenness") + describe_columns("weighted_betweenness") + \
+                         describe_columns("pagerank") + describe_columns("weighted_pagerank") + \
+                         describe_columns("degree") + describe_columns("weight") + \
+                         [("clique_number", int), ("clique_number_upper_bound", int), ("clique_number_exact", bool),
+                          ("m_count", int), ("f_count", int), ("movie_name", str), ("year", int),
+                          ("imdb_rating", float)]
+NODE_FEATURES_COLUMNS = [("total_weight", float), ("degree", int), ("movie_name", str), ("year", int),
+                         ("imdb_rating", float), ("closeness", float), ("betweenness_weight", float),
+                         ("betweenness", float), ("degree_centrality", float), ("clustering", float),
+                         ("pagerank", float), ("pr_weight", float), ("gender", str), ("name", str)]
+TRIANGLES_COLUMNS = [("0", str), ("1", str), ("2", str), ("3", str), ("4", int)]
+
+GRAPH_ANALYSES = {"features": Analysis(graph_features_analysis, GRAPH_FEATURES_COLUMNS),
+                  "genders": Analysis(node_features_analysis, NODE_FEATURES_COLUMNS),
+                  "triangles": Analysis(triangles_analysis, TRIANGLES_COLUMNS, binary=True)}
+
+
+def analyze_graphs(graphs, outputs, n_workers=1, store_output_path=OUTPUT_PATH):
+    """
+    Run the selected analyses in a single pass over the graphs
+    :param graphs: iterable of the graphs' corpus store ids, or of their JSON paths if store_output_path is None
+    :param outputs: dict from analysis name (features, genders or triangles) to its output path (.csv or .parquet)
+    :param n_workers: number of worker processes
+    :param store_output_path: the output directory of the corpus store which holds the graphs
+    :return: dict from analysis name to the number of written rows
+    """
+    analyses = {name: GRAPH_ANALYSES[name] for name in outputs}
+    return CorpusAnalyzer(analyses, n_workers).run(graphs, outputs, indexed={"genders", "triangles"},
+                                                   store_output_path=store_output_path)
+
+
+def analyze_movies(n_workers=1):
+    analyze_graphs(get_movies_video_ids(), {"features": f"{OUTPUT_PATH}/graph_features.csv"}, n_workers)
 
 
 def analyze_directors():
-    p = "../temp/directors/"
-    for director in os.listdir(p):
+    store = get_corpus_store(OUTPUT_PATH)
+    for director in store.get_people("directors"):
         res = []
-        json_path = os.path.join(p, director, "json")
         graphs = []
-        for g_pth in glob.glob(os.path.join(json_path, f"*roles*")):
-
-            if g_pth:
-                try:
-                    with open(g_pth) as f:
-                        g = json_graph.node_link_graph(json.load(f))
-                        d = extract_graph_features(g)
-                        d.update({"rating": g.graph["imdb_rating"], "year": g.graph["movie_year"],
-                                  "name": g.graph["movie_name"]})
-                        graphs.append(g)
-                    res.append(d)
-                except:
-                    pass
+        for v in store.get_videos(person_type="directors", person_name=director):
+            if "roles" not in v[VIDEO_NAME]:
+                continue
+            try:
+                g = store.get_graph(v["video_id"])
+                d = extract_graph_features(g)
+                d.update({"rating": g.graph["imdb_rating"], "year": g.graph["movie_year"],
+                          "name": g.graph["movie_name"]})
+                graphs.append(g)
+                res.append(d)
+            except:
+                pass
         if graphs:
             joined_grpah = nx.compose_all(graphs)
             d = extract_graph_features(joined_grpah)
             d["name"] = "combined"
             res.append(d)
-        pd.DataFrame(res).to_csv(f"../temp/output/{director}.csv", index=False)
+        os.makedirs(f"{OUTPUT_PATH}/output", exist_ok=True)
+        pd.DataFrame(res).to_csv(f"{OUTPUT_PATH}/output/{director}.csv", index=False)
 
 
 def get_triangles(g):
-    all_cliques = nx.enumerate_all_cliques(g)
-    return [x for x in all_cliques if len(x) == 3]
+    return list(iter_triangles(g))
 
 
-def analyze_triangles():
-    p = "../temp/movies/"
-    res = []
-    json_path = os.path.join(p, "*", "json")
-    for g_pth in tqdm(glob.glob(os.path.join(json_path, f"*roles.json"))):
-        if g_pth:
-            with open(g_pth) as f:
-                g = json_graph.node_link_graph(json.load(f))
-                tr = get_triangles(g)
-            for t in tr:
-                t.append(g.graph["movie_name"].replace(" - roles", ""))
-                t.append(g.graph["movie_year"])
-            res += tr
-
-    pd.DataFrame(res).to_csv(f"../temp/triangles.csv")
-
-
-def analyze_genders():
-    p = "../temp/movies/"
-    res = []
-    json_path = os.path.join(p, "*", "json")
-    for g_pth in tqdm(glob.glob(os.path.join(json_path, f"*roles.json"))):
+def analyze_triangles(n_workers=1):
+    analyze_graphs(get_movies_video_ids(roles=True), {"triangles": f"{OUTPUT_PATH}/triangles.csv"}, n_workers)
 
-        if g_pth:
-            with open(g_pth) as f:
-                g = json_graph.node_link_graph(json.load(f))
-                if g.number_of_nodes() > 5:
-                    d = get_node_features(g)
-                    res += list(d)
 
-    pd.DataFrame(res).to_csv(f"../temp/gender.csv")
+def analyze_genders(n_workers=1):
+    analyze_graphs(get_movies_video_ids(roles=True), {"genders": f"{OUTPUT_PATH}/gender.csv"}, n_workers)
 
 
-def extract_graph_features(g):
+def describe_values(values, prefix):
+    # float values have the same statistics even when there are no values
+    stats = pd.Series(values, dtype=float).describe()
+    del stats["count"]
+    return add_prefix_to_dict_keys(stats.to_dict(), prefix)
+
+
+def extract_graph_features(g, sampling_threshold=CENTRALITY_SAMPLING_THRESHOLD, epsilon=CENTRALITY_SAMPLING_EPSILON,
+                           seed=CENTRALITY_SAMPLING_SEED):
+    """
+    Extract the graph's features
+    :param g: the graph
+    :param sampling_threshold: for graphs with more nodes, closeness and betweenness are estimated from sampled pivots
+    (None - always compute the exact values)
+    :param epsilon: the estimation's error bound
+    :param seed: seed of the pivots sampling
+    :return: dict of the graph's features
+    """
+    features = GraphFeatures.from_graph(g, sampling_threshold, epsilon, seed)
+    betweenness = features.betweenness()
     d = {}
     d.update(get_edge_number(g))
     d.update(get_node_number(g))
     d.update(average_actor_appearance(g))
-    d.update(average_closeness_centrality(g))
-    d.update(average_clustering(g))
-    d.update(average_weighted_clustering(g))
-    d.update(average_betweenness_centrality(g))
-    d.update(average_weighted_betweenness_centrality(g))
+    d.update(describe_values(features.closeness(), "closeness"))
+    try:
+        d["average_clustering"] = features.average_clustering()
+    except ZeroDivisionError:
+        d["average_clustering"] = 0
+    try:
+        d["average_weighted_clustering"] = features.average_clustering(weight="weight")
+    except ZeroDivisionError:
+        d["average_weighted_clustering"] = 0
+    d.update(describe_values(betweenness, "betweenness"))
+    # the weighted betweenness has always been computed without the weights
+    d.update(describe_values(betweenness, "weighted_betweenness"))
     # d.update(average_eigenvector_centrality(g))
-    d.update(average_pagerank(g))
-    d.update(average_weighted_pagerank(g))
+    d.update(describe_values(features.pagerank(weight=None), "pagerank"))
+    d.update(describe_values(features.pagerank(weight="weight"), "weighted_pagerank"))
     d.update(average_graph_degree(g))
     d.update(average_graph_weight(g))
-    d.update(average_clustering(g))
     d.update(graph_clique_number(g))
     genders = get_genders_in_graph(g)
     d["m_count"] = genders.count("M")
@@ -295,11 +295,13 @@ def add_gender_to_graph(movie, is_roles=True):
     for graph_path in graph_paths:
         with open(graph_path) as f:
             g = json_graph.node_link_graph(json.load(f))
-            for v in g.nodes():
-                if is_roles:
-                    g.node[v]["gender"] = imdb_data.get_actor_gender(v)
-                else:
-                    g.node[v]["gender"] = imdb_data.get_actor_gender(g.node[v]['role'])
+            nodes = list(g.nodes())
+            if is_roles:
+                genders = imdb_data.get_actors_gender(nodes)
+            else:
+                genders = imdb_data.get_actors_gender([g.node[v]['role'] for v in nodes])
+            for v, gender in zip(nodes, genders):
+                g.node[v]["gender"] = gender
         data = json_graph.node_link_data(g)
         json_path = f"../temp/({g.graph[MOVIE_YEAR]}) - {movie}.json"
         with open(json_path, 'w') as fp:
@@ -307,22 +309,17 @@ def add_gender_to_graph(movie, is_roles=True):
 
 
 def gender_in_top_movies():
-    p = "../temp/movies/"
+    store = get_corpus_store(OUTPUT_PATH)
     movies = imdb_data.get_movies_data()
     for m in tqdm(movies):
         movie_name = m['primaryTitle'].replace('.', '').replace('/', '')
-        json_path = os.path.join(p, movie_name, "json")
-        try:
-            graph_path = glob.glob(os.path.join(json_path, f"*roles.json"))[0]
-            with open(graph_path) as f:
-                g = json_graph.node_link_graph(json.load(f))
-                yield get_genders_in_graph(g)
-        except IndexError:
-            pass
+        for v in store.get_videos("movies", name=movie_name):
+            if v[VIDEO_NAME].endswith(" - roles"):
+                yield get_genders_in_graph(store.get_graph(v["video_id"]))
 
 
 def get_genders_in_graph(g):
-    return [imdb_data.get_actor_gender(v) for v in g.nodes()]
+    return list(imdb_data.get_actors_gender(g.nodes()))
 
 
 if __name__ == "__main__":
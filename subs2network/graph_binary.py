@@ -0,0 +1,252 @@
+import json
+import numbers
+import os
+import struct
+
+import networkx as nx
+import numpy as np
+from networkx.readwrite import json_graph
+
+from subs2network.consts import GRAPH_BINARY_EXTENSION
+
+GRAPH_BINARY_MAGIC = b"S2NG"
+# bump when the file layout changes
+GRAPH_BINARY_VERSION = 1
+# magic, version and header length
+_PREFIX = struct.Struct("<4sII")
+_ALIGNMENT = 8
+_MISSING = object()
+
+
+def get_graph_binary_path(json_path):
+    """
+    Return the path of the graph's binary file, which is saved in a bin directory next to the graph's json directory
+    :param json_path: the graph's node link JSON path
+    :rtype: str
+    """
+    json_dir, name = os.path.split(json_path)
+    name = os.path.splitext(name)[0]
+    return os.path.join(os.path.dirname(json_dir), "bin", f"{name}.{GRAPH_BINARY_EXTENSION}")
+
+
+def _pad(n):
+    return -n % _ALIGNMENT
+
+
+def _encode_column(values):
+    """
+    Encode the attribute's values as a numpy column. Integer values are kept as int64, other numeric values as
+    float64 with NaN for missing values and any other values, including None, as int32 codes of a categories list
+    with -1 for missing values
+    :param values: list of the attribute's values
+    :return: tuple of (column, categories list or None)
+    """
+    present = [v for v in values if v is not _MISSING]
+    if all(isinstance(v, numbers.Number) and not isinstance(v, bool) for v in present):
+        if len(present) == len(values) and all(isinstance(v, numbers.Integral) for v in present):
+            return np.array(values, dtype=np.int64), None
+        return np.array([np.nan if v is _MISSING else v for v in values], dtype=np.float64), None
+    categories = list(dict.fromkeys(present))
+    index = {v: i for i, v in enumerate(categories)}
+    return np.array([-1 if v is _MISSING else index[v] for v in values], dtype=np.int32), categories
+
+
+def dumps_graph_binary(g):
+    """
+    Encode the graph in a compact binary format: a JSON header with the graph's attributes and the node names,
+    followed by the node table and the integer indexed edge list as aligned numpy columns
+    :param g: undirected networkx graph
+    :rtype: bytes
+    """
+    nodes = list(g.nodes())
+    index = {v: i for i, v in enumerate(nodes)}
+    edges = list(g.edges(data=True))
+
+    node_attributes = list(dict.fromkeys(k for v, d in g.nodes(data=True) for k in d))
+    edge_attributes = list(dict.fromkeys(k for v, u, d in edges for k in d))
+    columns = [("edges", "src", np.array([index[v] for v, u, d in edges], dtype=np.int32), None),
+               ("edges", "dst", np.array([index[u] for v, u, d in edges], dtype=np.int32), None)]
+    for k in node_attributes:
+        columns.append(("nodes", k) + _encode_column([g.nodes[v].get(k, _MISSING) for v in nodes]))
+    for k in edge_attributes:
+        columns.append(("edges", k) + _encode_column([d.get(k, _MISSING) for v, u, d in edges]))
+
+    header = {"version": GRAPH_BINARY_VERSION, "directed": g.is_directed(), "multigraph": g.is_multigraph(),
+              "graph": g.graph, "nodes": nodes, "edges_number": len(edges), "nodes_columns": {},
+              "edges_columns": {}}
+    offset = 0
+    for table, name, column, categories in columns:
+        header[f"{table}_columns"][name] = {"dtype": column.dtype.str, "offset": offset, "categories": categories}
+        offset += column.nbytes + _pad(column.nbytes)
+
+    header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header += b" " * _pad(_PREFIX.size + len(header))
+    parts = [_PREFIX.pack(GRAPH_BINARY_MAGIC, GRAPH_BINARY_VERSION, len(header)), header]
+    for table, name, column, categories in columns:
+        parts += [column.tobytes(), b"\0" * _pad(column.nbytes)]
+    return b"".join(parts)
+
+
+def save_graph_binary(g, path):
+    """
+    Save the graph's binary encoding, see dumps_graph_binary
+    :param g: undirected networkx graph
+    :param path: the binary file's path
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(dumps_graph_binary(g))
+    os.replace(tmp_path, path)
+
+
+class BinaryGraph(object):
+    """
+    Graph loaded from its binary encoding. The node table and the edge list are read only numpy views over the
+    encoding's buffer, so loading a graph doesn't copy or parse its columns
+    """
+
+    def __init__(self, buffer, source="buffer"):
+        """
+        :param buffer: uint8 numpy array of the graph's binary encoding
+        :param source: the encoding's file path or description, used in errors
+        """
+        magic, version, header_length = _PREFIX.unpack(buffer[:_PREFIX.size].tobytes())
+        if magic != GRAPH_BINARY_MAGIC or version != GRAPH_BINARY_VERSION:
+            raise ValueError(f"{source} isn't a version {GRAPH_BINARY_VERSION} binary graph")
+        data_offset = _PREFIX.size + header_length
+        header = json.loads(buffer[_PREFIX.size:data_offset].tobytes().decode("utf-8"))
+        self._graph = header["graph"]
+        self._directed = header["directed"]
+        self._multigraph = header["multigraph"]
+        self._nodes = header["nodes"]
+        self._categories = {}
+        self._nodes_columns = self._read_columns(buffer, data_offset, header["nodes_columns"], len(self._nodes),
+                                                 "nodes")
+        self._edges_columns = self._read_columns(buffer, data_offset, header["edges_columns"],
+                                                 header["edges_number"], "edges")
+
+    def _read_columns(self, buffer, data_offset, columns, length, table):
+        res = {}
+        for name, c in columns.items():
+            dtype = np.dtype(c["dtype"])
+            start = data_offset + c["offset"]
+            res[name] = buffer[start:start + length * dtype.itemsize].view(dtype)
+            if c["categories"] is not None:
+                self._categories[(table, name)] = c["categories"]
+        return res
+
+    @property
+    def graph(self):
+        return self._graph
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @property
+    def nodes_columns(self):
+        """
+        :return: dict from node attribute to its column, categorical attributes are columns of category codes
+        :rtype: dict
+        """
+        return self._nodes_columns
+
+    @property
+    def edges_columns(self):
+        """
+        :return: dict from edge attribute to its column, including the src and dst node indexes
+        :rtype: dict
+        """
+        return self._edges_columns
+
+    @property
+    def src(self):
+        return self._edges_columns["src"]
+
+    @property
+    def dst(self):
+        return self._edges_columns["dst"]
+
+    def get_categories(self, name, table="nodes"):
+        """
+        :param name: the attribute's name
+        :param table: nodes or edges
+        :return: the categories of a categorical attribute's codes or None if the attribute is numeric
+        :rtype: list
+        """
+        return self._categories.get((table, name))
+
+    def get_values(self, name, table="nodes", missing=None):
+        """
+        Decode the attribute's column to python values
+        :param name: the attribute's name
+        :param table: nodes or edges
+        :param missing: the value of the elements which don't have the attribute
+        :rtype: list
+        """
+        column = (self._nodes_columns if table == "nodes" else self._edges_columns)[name]
+        categories = self.get_categories(name, table)
+        if categories is not None:
+            return [missing if c < 0 else categories[c] for c in column.tolist()]
+        if column.dtype.kind == "f":
+            return [missing if np.isnan(v) else v for v in column.tolist()]
+        return column.tolist()
+
+    def to_networkx(self):
+        """
+        :return: the networkx graph, equal to the graph loaded from its node link JSON
+        :rtype: nx.Graph
+        """
+        g = nx.Graph()
+        if self._directed:
+            g = nx.DiGraph()
+        g.graph.update(self._graph)
+        nodes_values = {k: self.get_values(k, "nodes", _MISSING) for k in self._nodes_columns}
+        for i, v in enumerate(self._nodes):
+            g.add_node(v, **{k: values[i] for k, values in nodes_values.items() if values[i] is not _MISSING})
+        edges_values = {k: self.get_values(k, "edges", _MISSING) for k in self._edges_columns
+                        if k not in ("src", "dst")}
+        for i, (s, d) in enumerate(zip(self.src.tolist(), self.dst.tolist())):
+            g.add_edge(self._nodes[s], self._nodes[d],
+                       **{k: values[i] for k, values in edges_values.items() if values[i] is not _MISSING})
+        return g
+
+
+def load_graph_binary(path, use_mmap=False):
+    """
+    :param path: the binary file's path
+    :param use_mmap: memory map the file instead of reading it, which keeps the file open while the graph is used
+    :rtype: BinaryGraph
+    """
+    if use_mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        with open(path, "rb") as f:
+            buffer = np.frombuffer(f.read(), dtype=np.uint8)
+    return BinaryGraph(buffer, path)
+
+
+def loads_graph_binary(data):
+    """
+    :param data: the graph's binary encoding, the graph's columns are views over it
+    :rtype: BinaryGraph
+    """
+    return BinaryGraph(np.frombuffer(data, dtype=np.uint8))
+
+
+def load_graph(json_path, as_binary=False):
+    """
+    Load the graph from its binary file if it exists and is up to date, otherwise from its node link JSON
+    :param json_path: the graph's node link JSON path
+    :param as_binary: return the binary file's BinaryGraph instead of converting it to a networkx graph
+    :rtype: nx.Graph or BinaryGraph
+    """
+    binary_path = get_graph_binary_path(json_path)
+    if os.path.exists(binary_path) and os.path.getmtime(binary_path) >= os.path.getmtime(json_path):
+        bg = load_graph_binary(binary_path)
+        return bg if as_binary else bg.to_networkx()
+    with open(json_path) as f:
+        return json_graph.node_link_graph(json.load(f))
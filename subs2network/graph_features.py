@@ -0,0 +1,345 @@
+import math
+import time
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from subs2network.consts import CENTRALITY_SAMPLING_THRESHOLD, CENTRALITY_SAMPLING_EPSILON, CENTRALITY_SAMPLING_SEED, \
+    CLIQUE_TIME_BUDGET, CLIQUE_NODE_BUDGET
+from subs2network.graph_binary import BinaryGraph
+
+
+def get_pivots_number(n, epsilon=CENTRALITY_SAMPLING_EPSILON):
+    """
+    Number of pivots which estimates the closeness of all the nodes within an additive error of epsilon times the
+    graph's diameter with high probability (Eppstein & Wang)
+    :param n: number of nodes
+    :param epsilon: error bound
+    :rtype: int
+    """
+    if n < 2:
+        return n
+    return min(n, int(math.ceil(math.log(n) / epsilon ** 2)))
+
+
+class GraphFeatures(object):
+    """
+    Computes the nodes' centralities of an undirected graph from its sparse adjacency matrix. Intermediates which are
+    shared by several centralities, such as the all pairs shortest paths used by closeness and betweenness, are
+    computed once. The results are equal to networkx's closeness_centrality, betweenness_centrality, pagerank and
+    clustering. For large graphs closeness and betweenness can be estimated from the shortest paths of k sampled pivot
+    nodes, like networkx's betweenness_centrality with k. Binary graphs' matrices are built directly from their edge
+    list columns
+    """
+
+    def __init__(self, g, weight="weight", k=None, seed=None):
+        """
+        Convert the graph to a sparse adjacency matrix
+        :param g: undirected networkx graph or BinaryGraph
+        :param weight: the edges' weight attribute
+        :param k: number of pivots used to estimate closeness and betweenness (None - compute the exact values)
+        :param seed: seed of the pivots sampling
+        """
+        self._nodes, src, dst, weights = _get_edge_list(g, weight)
+        n = len(self._nodes)
+        # self loops are kept for pagerank, but are not part of any shortest path or triangle
+        loops = src == dst
+        rows = np.concatenate([src, dst[~loops]])
+        cols = np.concatenate([dst, src[~loops]])
+        weights = np.concatenate([weights, weights[~loops]])
+        self._weights = sp.csr_matrix((weights, (rows, cols)), shape=(n, n), dtype=float)
+        self._adj = (self._weights != 0).astype(float)
+        self._adj_no_loops = self._adj.tolil()
+        self._adj_no_loops.setdiag(0)
+        self._adj_no_loops = self._adj_no_loops.tocsr()
+        self._adj_no_loops.eliminate_zeros()
+        if k is not None and k < n:
+            self._sources = np.sort(np.random.RandomState(seed).choice(n, k, replace=False))
+        else:
+            self._sources = np.arange(n)
+        self._distances = None
+        self._sigma = None
+        self._betweenness = None
+        self._closeness = None
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @property
+    def is_sampled(self):
+        return len(self._sources) < len(self._nodes)
+
+    @classmethod
+    def from_graph(cls, g, sampling_threshold=CENTRALITY_SAMPLING_THRESHOLD, epsilon=CENTRALITY_SAMPLING_EPSILON,
+                   seed=CENTRALITY_SAMPLING_SEED):
+        """
+        Construct the graph's features, closeness and betweenness are estimated only for graphs with more nodes than
+        the threshold
+        :param g: undirected networkx graph
+        :param sampling_threshold: min number of nodes for which the centralities are estimated (None - never)
+        :param epsilon: the estimation's error bound, which sets the number of pivots
+        :param seed: seed of the pivots sampling
+        :rtype: GraphFeatures
+        """
+        k = None
+        if sampling_threshold is not None and len(g) > sampling_threshold:
+            k = get_pivots_number(len(g), epsilon)
+        return cls(g, k=k, seed=seed)
+
+    def to_dict(self, values):
+        """
+        :param values: array with a value for each node
+        :return: dict from node to its value
+        :rtype: dict
+        """
+        return dict(zip(self._nodes, values))
+
+    def _shortest_paths(self):
+        """
+        Breadth first search from all the source nodes at once, which counts the shortest paths from each source to each
+        node
+        """
+        n = len(self._nodes)
+        m = len(self._sources)
+        rows = np.arange(m)
+        distances = np.full((m, n), -1, dtype=int)
+        distances[rows, self._sources] = 0
+        sigma = np.zeros((m, n))
+        sigma[rows, self._sources] = 1
+        frontier = sigma.copy()
+        level = 0
+        while True:
+            level += 1
+            # number of shortest paths from each source to each node through the previous level's nodes
+            frontier = np.asarray(frontier @ self._adj_no_loops)
+            frontier[distances >= 0] = 0
+            reached = frontier > 0
+            if not reached.any():
+                break
+            distances[reached] = level
+            sigma[reached] = frontier[reached]
+        self._distances = distances
+        self._sigma = sigma
+
+    @property
+    def distances(self):
+        """
+        :return: matrix of the shortest paths lengths from each source to each node, -1 for unreachable nodes
+        :rtype: np.ndarray
+        """
+        if self._distances is None:
+            self._shortest_paths()
+        return self._distances
+
+    def closeness(self):
+        """
+        Closeness centrality, using Wasserman and Faust's improved formula for disconnected graphs. When pivots are
+        sampled, the average distance and the reachable share of each node are estimated from the pivots
+        :rtype: np.ndarray
+        """
+        if self._closeness is None:
+            n = len(self._nodes)
+            reachable = self.distances >= 0
+            is_source = np.zeros(self.distances.shape, dtype=bool)
+            is_source[np.arange(len(self._sources)), self._sources] = True
+            # the graph is undirected, so the distances from the sources are also the distances to them
+            reached = (reachable & ~is_source).sum(axis=0).astype(float)
+            others = len(self._sources) - is_source.sum(axis=0)
+            total = np.where(reachable, self.distances, 0).sum(axis=0)
+            self._closeness = np.zeros(n)
+            connected = total > 0
+            self._closeness[connected] = (reached[connected] / others[connected]) * (
+                    reached[connected] / total[connected])
+        return self._closeness
+
+    def betweenness(self):
+        """
+        Normalized betweenness centrality, the dependencies of all the sources are accumulated together level by level
+        (Brandes' algorithm). When pivots are sampled, the pivots' dependencies are extrapolated to all the nodes
+        :rtype: np.ndarray
+        """
+        if self._betweenness is None:
+            n = len(self._nodes)
+            distances = self.distances
+            sigma = self._sigma
+            delta = np.zeros(distances.shape)
+            max_distance = distances.max() if distances.size else 0
+            for level in range(max_distance, 1, -1):
+                mask = distances == level
+                x = np.where(mask, (1 + delta) / np.where(mask, sigma, 1), 0)
+                parents = distances == level - 1
+                y = np.asarray(x @ self._adj_no_loops)
+                delta[parents] = (sigma * y)[parents]
+            self._betweenness = delta.sum(axis=0)
+            if n > 2:
+                self._betweenness *= 1.0 / ((n - 1) * (n - 2))
+                if self.is_sampled:
+                    self._betweenness *= n / len(self._sources)
+        return self._betweenness
+
+    def pagerank(self, weight=None, alpha=0.85, max_iter=100, tol=1.0e-6):
+        """
+        PageRank by power iteration, as networkx's pagerank
+        :param weight: use the edges' weights (None - use 1 for all the edges)
+        :param alpha: damping parameter
+        :param max_iter: max number of iterations
+        :param tol: convergence tolerance
+        :rtype: np.ndarray
+        """
+        n = len(self._nodes)
+        if n == 0:
+            return np.zeros(0)
+        m = self._weights if weight is not None else self._adj
+        out_weight = np.asarray(m.sum(axis=1)).flatten()
+        out_weight[out_weight != 0] = 1.0 / out_weight[out_weight != 0]
+        m = sp.diags(out_weight) @ m
+        dangling = out_weight == 0
+
+        x = np.full(n, 1.0 / n)
+        p = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            x_last = x
+            x = alpha * (x @ m + x[dangling].sum() * p) + (1 - alpha) * p
+            if np.abs(x - x_last).sum() < n * tol:
+                return x
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    def clustering(self, weight=None):
+        """
+        Clustering coefficient, for weighted graphs the geometric average of the triangles' normalized edges weights
+        :param weight: use the edges' weights (None - use 1 for all the edges)
+        :rtype: np.ndarray
+        """
+        a = self._adj_no_loops
+        if weight is not None and self._weights.nnz:
+            a = a.multiply(self._weights) / self._weights.max()
+            a = sp.csr_matrix(a).power(1 / 3)
+        triangles = np.asarray((a @ a).multiply(a).sum(axis=1)).flatten()
+        degree = np.asarray(self._adj_no_loops.sum(axis=1)).flatten()
+        clustering = np.zeros(len(self._nodes))
+        has_triangles = triangles > 0
+        clustering[has_triangles] = triangles[has_triangles] / (
+                degree[has_triangles] * (degree[has_triangles] - 1))
+        return clustering
+
+    def average_clustering(self, weight=None):
+        """
+        :param weight: use the edges' weights (None - use 1 for all the edges)
+        :return: the average of the nodes' clustering coefficients
+        :rtype: float
+        """
+        if len(self._nodes) == 0:
+            raise ZeroDivisionError
+        return self.clustering(weight).sum() / len(self._nodes)
+
+
+def _get_edge_list(g, weight="weight"):
+    """
+    :param g: undirected networkx graph or BinaryGraph
+    :param weight: the edges' weight attribute, edges without it weigh 1
+    :return: tuple of (nodes list, source indexes, destination indexes, weights), the edge list columns are arrays
+    """
+    if isinstance(g, BinaryGraph):
+        weights = g.edges_columns.get(weight)
+        if weights is None or g.get_categories(weight, "edges") is not None:
+            weights = np.ones(len(g.src))
+        else:
+            weights = np.where(np.isnan(weights), 1, weights) if weights.dtype.kind == "f" else weights
+        return list(g.nodes), g.src.astype(int), g.dst.astype(int), weights.astype(float)
+    nodes = list(g.nodes())
+    index = {v: i for i, v in enumerate(nodes)}
+    if weight is None:
+        edges = [(v, u, 1) for v, u in g.edges()]
+    else:
+        edges = list(g.edges(data=weight, default=1))
+    src = np.array([index[v] for v, u, w in edges], dtype=int)
+    dst = np.array([index[u] for v, u, w in edges], dtype=int)
+    return nodes, src, dst, np.array([w for v, u, w in edges], dtype=float)
+
+
+def iter_triangles(g):
+    """
+    Lazily enumerate the graph's triangles. Nodes are ranked by their degree and each triangle is found once, from
+    its lowest ranked node, by intersecting the neighbors which are ranked higher (node iterator with degree ordering)
+    :param g: undirected networkx graph or BinaryGraph
+    :return: generator of [v, u, w] triangles
+    """
+    nodes, src, dst, weights = _get_edge_list(g, None)
+    n = len(nodes)
+    # self loops add 2 to the node's degree, as in networkx
+    degree = np.bincount(src, minlength=n) + np.bincount(dst, minlength=n)
+    order = np.argsort(degree, kind="stable").tolist()
+    rank = [0] * n
+    for i, v in enumerate(order):
+        rank[v] = i
+    higher = [set() for _ in range(n)]
+    for i, j in zip(src.tolist(), dst.tolist()):
+        if rank[i] < rank[j]:
+            higher[i].add(j)
+        elif rank[j] < rank[i]:
+            higher[j].add(i)
+    for v in order:
+        for u in sorted(higher[v], key=rank.__getitem__):
+            for w in sorted(higher[v] & higher[u], key=rank.__getitem__):
+                yield [nodes[v], nodes[u], nodes[w]]
+
+
+def clique_number_bounds(g):
+    """
+    Fast bounds of the graph's clique number. The lower bound is the largest clique grown greedily from each node
+    through its highest core number neighbors, the upper bound is the smaller of the degeneracy + 1 and the number
+    of colors of a greedy coloring
+    :param g: undirected networkx graph
+    :return: tuple of (lower bound, upper bound)
+    :rtype: tuple
+    """
+    if len(g) == 0:
+        return 0, 0
+    h = nx.Graph(g)
+    h.remove_edges_from([(v, u) for v, u in h.edges() if v == u])
+    core = nx.core_number(h)
+    upper = min(max(core.values()) + 1, len(set(nx.greedy_color(h, strategy="largest_first").values())))
+
+    lower = 1
+    for v in sorted(h, key=core.get, reverse=True):
+        if core[v] + 1 <= lower:
+            # the node can't be part of a larger clique
+            break
+        clique_size = 1
+        candidates = set(h[v])
+        while candidates:
+            u = max(candidates, key=core.get)
+            clique_size += 1
+            candidates &= set(h[u])
+        lower = max(lower, clique_size)
+    return lower, upper
+
+
+def clique_number(g, time_budget=CLIQUE_TIME_BUDGET, node_budget=CLIQUE_NODE_BUDGET):
+    """
+    The graph's clique number, the exact maximal cliques search runs only when the bounds differ and stops when the
+    time budget is exceeded
+    :param g: undirected networkx graph
+    :param time_budget: max number of seconds for the exact search (None - no limit)
+    :param node_budget: max number of nodes for which the exact search runs (None - no limit)
+    :return: tuple of (clique number or its lower bound, upper bound, whether the clique number is exact)
+    :rtype: tuple
+    """
+    lower, upper = clique_number_bounds(g)
+    if lower == upper:
+        return lower, upper, True
+    if node_budget is not None and len(g) > node_budget:
+        return lower, upper, False
+    start = time.time()
+    for c in nx.find_cliques(g):
+        lower = max(lower, len(c))
+        if lower == upper:
+            return lower, upper, True
+        if time_budget is not None and time.time() - start > time_budget:
+            return lower, upper, False
+    return lower, lower, True
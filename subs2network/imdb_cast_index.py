@@ -0,0 +1,130 @@
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from subs2network.cast_records import CAST_RECORD_VERSION
+from subs2network.consts import IMDB_PRINCIPALS_URL, IMDB_NAMES_URL, IMDB_RATING_URL, OUTPUT_PATH, \
+    IMDB_CAST_INDEX_PATH
+from subs2network.utils import download_file
+
+CAST_CATEGORIES = ("actor", "actress", "self")
+
+
+def _read_tsv(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        header = next(reader)
+        for row in reader:
+            yield dict(zip(header, (None if v == "\\N" else v for v in row)))
+
+
+def to_tconst(imdb_id):
+    """
+    :param imdb_id: the video's IMDB id, with or without the tt prefix
+    :return: the video's IMDB tconst
+    :rtype: str
+    """
+    imdb_id = str(imdb_id)
+    if imdb_id.startswith("tt"):
+        return imdb_id
+    return f"tt{int(imdb_id):07d}"
+
+
+class IMDbCastIndex(object):
+    """
+    Local per title index of the IMDb principals, names and ratings datasets, which provides the cast records of the
+    videos without querying IMDb. The principals dataset holds only the top billed cast of each title
+    """
+
+    def __init__(self, path=IMDB_CAST_INDEX_PATH):
+        """
+        :param path: path to the index's SQLite file
+        """
+        self._path = path
+        self._local = threading.local()
+
+    @property
+    def exists(self):
+        return os.path.exists(self._path)
+
+    def _get_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def build(self, overwrite=False, verbose=True):
+        """
+        Download the IMDb datasets and build the index, this is done once and takes several minutes
+        :param overwrite: rebuild the index if it already exists
+        :param verbose: show the downloads progress
+        """
+        if self.exists and not overwrite:
+            return
+        principals_path = f"{OUTPUT_PATH}/title.principals.tsv.gz"
+        names_path = f"{OUTPUT_PATH}/name.basics.tsv.gz"
+        ratings_path = f"{OUTPUT_PATH}/title.ratings.tsv.gz"
+        download_file(IMDB_PRINCIPALS_URL, principals_path, False, verbose=verbose)
+        download_file(IMDB_NAMES_URL, names_path, False, verbose=verbose)
+        download_file(IMDB_RATING_URL, ratings_path, False, verbose=verbose)
+
+        # build to a temporary file so processes never open a partially built index
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE principals (tconst TEXT, ordering INTEGER, nconst TEXT, characters TEXT)")
+        conn.execute("CREATE TABLE names (nconst TEXT PRIMARY KEY, primaryName TEXT)")
+        conn.execute("CREATE TABLE ratings (tconst TEXT PRIMARY KEY, averageRating REAL)")
+
+        logging.info("Indexing the IMDb principals")
+        conn.executemany("INSERT INTO principals VALUES (?, ?, ?, ?)",
+                         ((r["tconst"], int(r["ordering"]), r["nconst"], r["characters"])
+                          for r in _read_tsv(principals_path) if r["category"] in CAST_CATEGORIES))
+        conn.execute("CREATE INDEX principals_tconst ON principals (tconst, ordering)")
+        logging.info("Indexing the IMDb names")
+        conn.executemany("INSERT OR REPLACE INTO names VALUES (?, ?)",
+                         ((r["nconst"], r["primaryName"]) for r in _read_tsv(names_path)))
+        logging.info("Indexing the IMDb ratings")
+        conn.executemany("INSERT OR REPLACE INTO ratings VALUES (?, ?)",
+                         ((r["tconst"], float(r["averageRating"])) for r in _read_tsv(ratings_path)))
+        conn.commit()
+        conn.close()
+        os.replace(tmp_path, self._path)
+
+    def get_cast_record(self, imdb_id):
+        """
+        Return the video's cast record
+        :param imdb_id: the video's IMDB id
+        :return: cast record dict or None if the video isn't in the index
+        :rtype: dict
+        """
+        tconst = to_tconst(imdb_id)
+        conn = self._get_connection()
+        rows = conn.execute("SELECT p.nconst, n.primaryName, p.characters FROM principals p "
+                            "JOIN names n ON p.nconst = n.nconst WHERE p.tconst=? ORDER BY p.ordering",
+                            (tconst,)).fetchall()
+        if not rows:
+            return None
+        cast = []
+        for i, (nconst, name, characters) in enumerate(rows):
+            characters = json.loads(characters) if characters else []
+            roles = [{"id": None, "name": c, "notes": ""} for c in characters]
+            if not roles:
+                roles = [{"id": None, "name": None, "notes": ""}]
+            cast.append({"id": nconst[2:], "name": name, "order": i, "notes": "", "roles": roles,
+                         "roles_list": len(roles) > 1})
+        rating = conn.execute("SELECT averageRating FROM ratings WHERE tconst=?", (tconst,)).fetchone()
+        return {"version": CAST_RECORD_VERSION, "imdb_id": str(imdb_id), "rating": rating[0] if rating else None,
+                "cast": cast}
+
+
+imdb_cast_index = IMDbCastIndex()
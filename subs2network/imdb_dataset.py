@@ -1,12 +1,19 @@
+import logging
+import os
+import shutil
+
+import pandas as pd
 import turicreate.aggregate as agg
 from turicreate import SFrame
 
 from subs2network.consts import IMDB_RATING_URL, OUTPUT_PATH, IMDB_CREW_URL, IMDB_TITLES_URL, IMDB_PRINCIPALS_URL, \
-    DATA_PATH, IMDB_NAMES_URL
+    DATA_PATH, IMDB_NAMES_URL, IMDB_DATASETS_PATH
 from subs2network.utils import download_file
 
 
 def get_gender(profession):
+    if profession is None:
+        raise IndexError
     if "actor" in profession:
         return "M"
     if "actress" in profession:
@@ -23,33 +30,129 @@ class IMDbDatasets(object):
         self._actors = None
         self._actors_movies = None
         self._first_name_gender = None
+        self._first_names_gender = None
         self._actors_gender = None
         self._all_actors = None
+        self._principals = None
+        self._names = None
+        self._movies_rating = None
+        self._actors_movies_ranges = None
         self._verbose = verbose
 
+    @staticmethod
+    def _get_dataset_path(name):
+        return os.path.join(IMDB_DATASETS_PATH, f"{name}.sframe")
+
+    def _read_dataset(self, name, url, key):
+        """
+        Read an IMDb dataset. The dataset's TSV is parsed only on the first read and saved sorted by its key as a
+        binary SFrame, which later reads (in any process) open lazily from disk
+        :param name: the dataset's name, such as title.ratings
+        :param url: the dataset's download url
+        :param key: the dataset's key column (tconst or nconst)
+        :return: SFrame of the dataset
+        :rtype: SFrame
+        """
+        sframe_path = self._get_dataset_path(name)
+        if not os.path.exists(sframe_path):
+            tsv_path = f"{OUTPUT_PATH}/{name}.tsv.gz"
+            download_file(url, tsv_path, False)
+            logging.info(f"Converting {tsv_path} to {sframe_path}")
+            sf = SFrame.read_csv(tsv_path, delimiter="\t", na_values=["\\N"], verbose=self._verbose)
+            os.makedirs(IMDB_DATASETS_PATH, exist_ok=True)
+            tmp_path = f"{sframe_path}.{os.getpid()}.tmp"
+            sf.sort(key).save(tmp_path)
+            try:
+                os.rename(tmp_path, sframe_path)
+            except OSError:
+                # another process already saved the dataset
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        return SFrame(sframe_path)
+
     def get_movie_rating(self, imdb_id):
-        try:
-            return self.rating[self.rating["tconst"] == f"tt{imdb_id}"]["averageRating"][0]
-        except IndexError:
-            return None
+        return self.movies_rating.get(f"tt{imdb_id}")
+
+    def get_movies_rating(self, imdb_ids):
+        """
+        Return the rating of each of the movies
+        :param imdb_ids: list of the movies' IMDB ids (without the tt prefix)
+        :return: list of the movies' ratings, None for movies without a rating
+        :rtype: list
+        """
+        return [self.movies_rating.get(f"tt{imdb_id}") for imdb_id in imdb_ids]
+
+    @property
+    def movies_rating(self):
+        """
+        :return: dict from tconst to the title's average rating
+        :rtype: dict
+        """
+        if self._movies_rating is None:
+            self._movies_rating = dict(zip(self.rating["tconst"], self.rating["averageRating"]))
+        return self._movies_rating
 
     def get_actor_gender(self, actor):
+        gender = self.actors_gender.get(actor)
+        if gender is not None:
+            return gender
         try:
-            return self.actors_gender[actor]
-        except KeyError:
-            try:
-                first_name = actor.split(" ")[0].lower()
-                return self.first_name_gender[first_name]["Gender"][:1]
-            except KeyError:
-                return "U"
+            return self.first_names_gender.get(actor.split(" ")[0].lower(), "U")
+        except AttributeError:
+            return "U"
+
+    def get_actors_gender(self, actors):
+        """
+        Return the gender of each of the actors, actors who aren't in IMDb are matched by their first name
+        :param actors: iterable of actors (or roles) names
+        :return: array of the actors' genders - M, F or U (unknown)
+        :rtype: numpy.ndarray
+        """
+        actors = pd.Series(list(actors), dtype=object)
+        genders = actors.map(self.actors_gender)
+        missing = genders.isna()
+        if missing.any():
+            first_names = actors[missing].str.split(" ").str[0].str.lower()
+            genders[missing] = first_names.map(self.first_names_gender)
+        return genders.fillna("U").values.astype(object)
 
     @property
     def actors_gender(self):
+        """
+        The actors' names to gender map is built from all_actors once and saved next to the IMDb datasets, the saved
+        map is rebuilt when the names dataset is replaced
+        :return: Series from the actor's name to M or F
+        :rtype: pd.Series
+        """
         if self._actors_gender is None:
-            self._actors_gender = self.all_actors[["primaryName", "gender"]].unstack(["primaryName", "gender"])[0][
-                "Dict of primaryName_gender"]
+            path = os.path.join(IMDB_DATASETS_PATH, "actors_gender.pkl")
+            # opening the names dataset also converts it, if it was removed to be downloaded again
+            self.names
+            source = os.stat(self._get_dataset_path("name.basics")).st_mtime_ns
+            if os.path.exists(path):
+                saved = pd.read_pickle(path)
+                if isinstance(saved, dict) and saved.get("source") == source:
+                    self._actors_gender = saved["actors_gender"]
+            if self._actors_gender is None:
+                df = self.all_actors[["primaryName", "gender"]].to_dataframe()
+                self._actors_gender = df.drop_duplicates("primaryName", keep="last").set_index("primaryName")[
+                    "gender"]
+                os.makedirs(IMDB_DATASETS_PATH, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                pd.to_pickle({"source": source, "actors_gender": self._actors_gender}, tmp_path)
+                os.replace(tmp_path, path)
         return self._actors_gender
 
+    @property
+    def first_names_gender(self):
+        """
+        :return: Series from the lower case first name to M or F
+        :rtype: pd.Series
+        """
+        if self._first_names_gender is None:
+            self._first_names_gender = pd.Series(
+                {n: d["Gender"][:1] for n, d in self.first_name_gender.items() if d.get("Gender")}, dtype=object)
+        return self._first_names_gender
+
     def add_actor_gender(self, actor):
         try:
             return get_gender(actor["primaryProfession"])
@@ -69,27 +172,63 @@ class IMDbDatasets(object):
             return None
 
     def get_actor_movies(self, actor):
-        try:
-            return self.actors_movies[self.actors_movies["nconst"] == actor]
-        except IndexError:
-            return None
+        start, end = self.actors_movies_ranges.get(actor, (0, 0))
+        return self.actors_movies[start:end]
+
+    def get_actors_movies(self, actors):
+        """
+        Return the movies of all the actors
+        :param actors: list of the actors' nconst
+        :return: SFrame of the actors' movies
+        :rtype: SFrame
+        """
+        return self.actors_movies.filter_by(actors, "nconst")
+
+    @property
+    def actors_movies_ranges(self):
+        """
+        actors_movies is sorted by nconst, so each actor's movies are a continuous range of its rows
+        :return: dict from nconst to the (start, end) rows range of the actor's movies
+        :rtype: dict
+        """
+        if self._actors_movies_ranges is None:
+            self._actors_movies_ranges = {}
+            start = 0
+            prev = None
+            for i, nconst in enumerate(self.actors_movies["nconst"]):
+                if nconst != prev:
+                    if prev is not None:
+                        self._actors_movies_ranges[prev] = (start, i)
+                    start = i
+                    prev = nconst
+            if prev is not None:
+                self._actors_movies_ranges[prev] = (start, len(self.actors_movies))
+        return self._actors_movies_ranges
+
+    @property
+    def principals(self):
+        if self._principals is None:
+            self._principals = self._read_dataset("title.principals", IMDB_PRINCIPALS_URL, "tconst")
+        return self._principals
+
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = self._read_dataset("name.basics", IMDB_NAMES_URL, "nconst")
+        return self._names
 
     @property
     def popular_actors(self):
         if self._actors is None:
-            download_file(IMDB_PRINCIPALS_URL, f"{OUTPUT_PATH}/title.principals.tsv.gz", False)
-            self._actors = SFrame.read_csv(f"{OUTPUT_PATH}/title.principals.tsv.gz", delimiter="\t", na_values=["\\N"],
-                                           verbose=self._verbose)
-            self._actors = self._actors.filter_by(["actor", "actress"], "category")["tconst", "nconst"]
+            self._actors = self.principals.filter_by(["actor", "actress"], "category")["tconst", "nconst"]
 
             self._actors = self._actors.join(
                 self.rating[(self.rating["titleType"] == "movie") & (self.rating["numVotes"] > 1000)])
             self._actors = self._actors.groupby("nconst", operations={'averageRating': agg.AVG("averageRating"),
                                                                       'count': agg.COUNT()})
             self._actors = self._actors.sort("averageRating", ascending=False)
-            names = SFrame.read_csv(f"{OUTPUT_PATH}/name.basics.tsv.gz", delimiter="\t")
 
-            self._actors = self._actors.join(names)
+            self._actors = self._actors.join(self.names)
             self._actors["gender"] = self._actors.apply(lambda p: self.add_actor_gender(p))
 
         return self._actors
@@ -97,52 +236,41 @@ class IMDbDatasets(object):
     @property
     def actors_movies(self):
         if self._actors_movies is None:
-            download_file(IMDB_PRINCIPALS_URL, f"{OUTPUT_PATH}/title.principals.tsv.gz", False)
-            self._actors_movies = SFrame.read_csv(f"{OUTPUT_PATH}/title.principals.tsv.gz", delimiter="\t",
-                                                  na_values=["\\N"], verbose=self._verbose)
-            self._actors_movies = self._actors_movies.filter_by(["actor", "actress"], "category")[
+            self._actors_movies = self.principals.filter_by(["actor", "actress"], "category")[
                 "tconst", "nconst", "characters"]
             self._actors_movies = self._actors_movies.join(self.title[self.title["titleType"] == "movie"])
-            self._actors_movies = self._actors_movies.join(self.all_actors)
+            self._actors_movies = self._actors_movies.join(self.all_actors).sort("nconst")
         return self._actors_movies
 
     @property
     def all_actors(self):
         if self._all_actors is None:
-            download_file(IMDB_NAMES_URL, f"{OUTPUT_PATH}/name.basics.tsv.gz", False)
-            self._all_actors = SFrame.read_csv(f"{OUTPUT_PATH}/name.basics.tsv.gz", delimiter="\t",
-                                               na_values=["\\N"], verbose=self._verbose)
+            self._all_actors = self.names.dropna("primaryProfession")
             self._all_actors["primaryProfession"] = self._all_actors["primaryProfession"].apply(lambda x: x.split(","))
             self._all_actors = self._all_actors.stack("primaryProfession", "primaryProfession")
-            self._all_actors = self._all_actors.filter_by(["actor", "actress"], "primaryProfession")
-            self._all_actors["gender"] = self._all_actors.apply(lambda p: self.add_actor_gender(p))
+            profession_gender = SFrame({"primaryProfession": ["actor", "actress"], "gender": ["M", "F"]})
+            self._all_actors = self._all_actors.join(profession_gender, on="primaryProfession")
         return self._all_actors
 
     @property
     def rating(self):
         if self._rating is None:
-            download_file(IMDB_RATING_URL, f"{OUTPUT_PATH}/title.ratings.tsv.gz", False)
-            self._rating = SFrame.read_csv(f"{OUTPUT_PATH}/title.ratings.tsv.gz", delimiter="\t", na_values=["\\N"],
-                                           verbose=self._verbose)
+            self._rating = self._read_dataset("title.ratings", IMDB_RATING_URL, "tconst")
             self._rating = self._rating.join(self.title)
         return self._rating
 
     @property
     def crew(self):
         if self._crew is None:
-            download_file(IMDB_CREW_URL, f"{OUTPUT_PATH}/title.crew.tsv.gz", False)
-            self._crew = SFrame.read_csv(f"{OUTPUT_PATH}/title.crew.tsv.gz", delimiter="\t", na_values=["\\N"],
-                                         verbose=self._verbose)
-            self._crew["directors"] = self.crew["directors"].apply(lambda c: c.split(","))
+            self._crew = self._read_dataset("title.crew", IMDB_CREW_URL, "tconst").dropna("directors")
+            self._crew["directors"] = self._crew["directors"].apply(lambda c: c.split(","))
             self._crew = self._crew.stack("directors", "directors")
         return self._crew
 
     @property
     def title(self):
         if self._title is None:
-            download_file(IMDB_TITLES_URL, f"{OUTPUT_PATH}/title.basics.tsv.gz", False)
-            self._title = SFrame.read_csv(f"{OUTPUT_PATH}/title.basics.tsv.gz", delimiter="\t", na_values=["\\N"],
-                                          verbose=self._verbose)
+            self._title = self._read_dataset("title.basics", IMDB_TITLES_URL, "tconst")
         return self._title
 
     @property
@@ -172,8 +300,7 @@ class IMDbDatasets(object):
 
         sf = sf[sf["count"] > 5]
 
-        names = SFrame.read_csv(f"{OUTPUT_PATH}/name.basics.tsv.gz", delimiter="\t")
-        sf = sf.join(names, {"directors": "nconst"})
+        sf = sf.join(self.names, {"directors": "nconst"})
         return sf.sort("averageRating", ascending=False)
 
     def get_movies_by_character(self, character):
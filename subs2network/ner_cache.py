@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from subs2network.consts import NER_CACHE_PATH, STANFORD_NLP_MODEL
+
+# bump when the cached entities format or the subtitle cleaning changes
+NER_CACHE_VERSION = 1
+
+
+def get_models_version(nlp, stanford_model_path=STANFORD_NLP_MODEL):
+    """
+    Return a string which identifies the NER models used to tag the subtitles
+    :param nlp: the spaCy model used for NER
+    :param stanford_model_path: path to the Stanford NER CRF model
+    :rtype: str
+    """
+    stanford_version = f"{os.path.basename(stanford_model_path)}:{os.path.getsize(stanford_model_path)}"
+    spacy_version = f"{nlp.meta['lang']}_{nlp.meta['name']}-{nlp.meta['version']}"
+    return f"{NER_CACHE_VERSION}|{stanford_version}|{spacy_version}"
+
+
+class NERCache(object):
+    """
+    On disk cache of the per line NER output of subtitle files, keyed by the hash of the subtitle file's content and
+    the NER models versions
+    """
+
+    def __init__(self, cache_path=NER_CACHE_PATH):
+        self._cache_path = cache_path
+        os.makedirs(cache_path, exist_ok=True)
+
+    @staticmethod
+    def get_key(subtitle_path, models_version):
+        """
+        Return the cache key of a subtitle file
+        :param subtitle_path: path to the SRT file
+        :param models_version: the NER models version string
+        :rtype: str
+        """
+        h = hashlib.sha1()
+        with open(subtitle_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        h.update(models_version.encode("utf-8"))
+        return h.hexdigest()
+
+    def load(self, key):
+        """
+        Load the cached entities
+        :param key: the subtitle's cache key
+        :return: tuple of (stanford entities, spacy entities, brackets) lists or None if the key is not cached
+        """
+        try:
+            with gzip.open(self._get_path(key), "rt", encoding="utf-8") as f:
+                d = json.load(f)
+        except (FileNotFoundError, EOFError, ValueError):
+            return None
+        logging.debug(f"Loaded cached NER entities {key}")
+        entities_nltk = [[tuple(e) for e in line] for line in d["entities_nltk"]]
+        entities_spacy = [[tuple(e) for e in line] for line in d["entities_spacy"]]
+        return entities_nltk, entities_spacy, d["brackets"]
+
+    def save(self, key, entities_nltk, entities_spacy, brackets):
+        """
+        Save the entities of a subtitle file
+        :param key: the subtitle's cache key
+        :param entities_nltk: per line list of (token, tag) tuples tagged by Stanford NER
+        :param entities_spacy: per line list of (text, label) tuples tagged by spaCy
+        :param brackets: per line list of the bracketed texts
+        """
+        path = self._get_path(key)
+        # write to a temporary file first so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"entities_nltk": entities_nltk, "entities_spacy": entities_spacy, "brackets": brackets}, f)
+        os.replace(tmp_path, path)
+
+    def _get_path(self, key):
+        return os.path.join(self._cache_path, f"{key}.json.gz")
@@ -0,0 +1,186 @@
+import atexit
+import logging
+import os
+import queue
+import socket
+import subprocess
+import threading
+import time
+
+from subs2network.consts import STANFORD_NLP_JAR, STANFORD_NLP_MODEL, STANFORD_NER_POOL_SIZE, STANFORD_NER_MEMORY, \
+    STANFORD_NER_STARTUP_TIMEOUT
+
+
+class StanfordNERServer(object):
+    """
+    Long lived Stanford NER JVM which loads the CRF model once and tags sentences sent to it over a local socket
+    """
+
+    def __init__(self, model_path=STANFORD_NLP_MODEL, jar_path=STANFORD_NLP_JAR, memory=STANFORD_NER_MEMORY,
+                 encoding="utf-8"):
+        """
+        Construct the server wrapper, the JVM itself is only started on the first call to start
+        :param model_path: path to the Stanford NER CRF model
+        :param jar_path: path to stanford-ner.jar
+        :param memory: max heap size of the JVM
+        :param encoding: encoding used to communicate with the server
+        """
+        self._model_path = model_path
+        self._jar_path = jar_path
+        self._memory = memory
+        self._encoding = encoding
+        self._port = None
+        self._process = None
+
+    @property
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self, timeout=STANFORD_NER_STARTUP_TIMEOUT):
+        """
+        Start the JVM (if needed) and wait until the model is loaded and the server accepts connections
+        :param timeout: max number of seconds to wait for the server
+        """
+        if self.is_running:
+            return
+        self._port = self._get_free_port()
+        cmd = ["java", f"-mx{self._memory}", "-cp", self._jar_path, "edu.stanford.nlp.ie.NERServer",
+               "-loadClassifier", self._model_path, "-port", str(self._port), "-outputFormat", "slashTags",
+               "-tokenizerFactory", "edu.stanford.nlp.process.WhitespaceTokenizer",
+               "-tokenizerOptions", "tokenizeNLs=false", "-encoding", self._encoding]
+        logging.debug(f"Starting Stanford NER server on port {self._port}")
+        self._process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Stanford NER server exited with code {self._process.returncode}")
+            try:
+                socket.create_connection(("localhost", self._port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.5)
+        self.stop()
+        raise TimeoutError(f"Stanford NER server did not start within {timeout} seconds")
+
+    def stop(self):
+        if self.is_running:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self._process = None
+
+    def tag_sents(self, sentences):
+        """
+        Tag a list of tokenized sentences, the output has the same format as nltk's StanfordNERTagger.tag_sents
+        :param sentences: list of lists of tokens
+        :return: list of lists of (token, tag) tuples
+        """
+        sentences = [list(s) for s in sentences]
+        text = " ".join(w for s in sentences for w in s)
+        if not text:
+            return [[] for _ in sentences]
+        with socket.create_connection(("localhost", self._port)) as conn:
+            conn.sendall((text.replace("\n", " ") + "\n").encode(self._encoding))
+            conn.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                chunks.append(data)
+        return self._parse_output(b"".join(chunks).decode(self._encoding), sentences)
+
+    @staticmethod
+    def _parse_output(text, sentences):
+        tagged_words = []
+        for tagged_word in text.split():
+            word_tags = tagged_word.split("/")
+            tagged_words.append(("/".join(word_tags[:-1]), word_tags[-1]))
+
+        # split the tagged words back to the input sentences
+        result = []
+        start = 0
+        for s in sentences:
+            result.append(tagged_words[start:start + len(s)])
+            start += len(s)
+        return result
+
+    @staticmethod
+    def _get_free_port():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("localhost", 0))
+            return s.getsockname()[1]
+
+
+class StanfordNERPool(object):
+    """
+    Pool of Stanford NER servers, allowing several videos to be tagged at the same time without paying for the JVM
+    startup and model loading on every video
+    """
+
+    def __init__(self, pool_size=STANFORD_NER_POOL_SIZE, model_path=STANFORD_NLP_MODEL, jar_path=STANFORD_NLP_JAR):
+        """
+        Construct the pool, servers are started lazily when they are first needed
+        :param pool_size: max number of NER servers that can tag at the same time
+        :param model_path: path to the Stanford NER CRF model
+        :param jar_path: path to stanford-ner.jar
+        """
+        self._servers = [StanfordNERServer(model_path, jar_path) for _ in range(max(pool_size, 1))]
+        # LIFO so an already running server is reused before a new JVM is started
+        self._idle = queue.LifoQueue()
+        for server in reversed(self._servers):
+            self._idle.put(server)
+
+    @property
+    def pool_size(self):
+        return len(self._servers)
+
+    def tag_sents(self, sentences):
+        """
+        Tag a list of tokenized sentences using the first idle server in the pool
+        :param sentences: list of lists of tokens
+        :return: list of lists of (token, tag) tuples
+        """
+        server = self._idle.get()
+        try:
+            server.start()
+            try:
+                return server.tag_sents(sentences)
+            except OSError:
+                logging.warning("Stanford NER server connection failed, restarting the server")
+                server.stop()
+                server.start()
+                return server.tag_sents(sentences)
+        finally:
+            self._idle.put(server)
+
+    def close(self):
+        for server in self._servers:
+            server.stop()
+
+
+_ner_pool = None
+_ner_pool_pid = None
+_ner_pool_lock = threading.Lock()
+
+
+def get_ner_pool(pool_size=None):
+    """
+    Return the process wide Stanford NER pool, creating it on the first call
+    :param pool_size: size of the pool, only used when the pool is created (default STANFORD_NER_POOL_SIZE)
+    :return: StanfordNERPool
+    :rtype: StanfordNERPool
+    """
+    global _ner_pool, _ner_pool_pid
+    with _ner_pool_lock:
+        # a forked child must not share the parent's servers bookkeeping
+        if _ner_pool is None or _ner_pool_pid != os.getpid():
+            if pool_size is None:
+                pool_size = STANFORD_NER_POOL_SIZE
+            _ner_pool = StanfordNERPool(pool_size)
+            _ner_pool_pid = os.getpid()
+            atexit.register(_ner_pool.close)
+        return _ner_pool
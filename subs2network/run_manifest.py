@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import threading
+import time
+
+DONE = "done"
+EXISTS = "exists"
+FAILED = "failed"
+ERROR = "error"
+
+
+class RunManifest(object):
+    """
+    Append only JSONL journal of a batch run. Each processed video is recorded with its status, run time and error
+    class, so an interrupted run can skip the completed videos and retry only the failed ones
+    """
+    COMPLETED_STATUSES = {DONE, EXISTS}
+
+    def __init__(self, path):
+        """
+        Open the manifest and load the latest status of each video that was already recorded
+        :param path: path to the manifest's JSONL file
+        """
+        self._path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    # a line which was partially written when the previous run crashed
+                    logging.warning(f"Skipping corrupted manifest line: {line}")
+                    continue
+                self._entries[entry["id"]] = entry
+            # make sure new entries are not appended to a partially written line
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    with open(self._path, "ab") as fa:
+                        fa.write(b"\n")
+
+    def record(self, video_id, status, error=None, elapsed=None):
+        """
+        Append the video's status to the manifest, the entry is flushed to disk before returning
+        :param video_id: the video's IMDB id (tconst)
+        :param status: one of done, exists, failed or error
+        :param error: the error class name if the video failed
+        :param elapsed: processing time in seconds
+        """
+        entry = {"id": video_id, "status": status, "elapsed": elapsed, "error": error, "time": time.time()}
+        with self._lock:
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[video_id] = entry
+
+    def is_completed(self, video_id):
+        try:
+            return self._entries[video_id]["status"] in self.COMPLETED_STATUSES
+        except KeyError:
+            return False
+
+    def get_status(self, video_id):
+        try:
+            return self._entries[video_id]["status"]
+        except KeyError:
+            return None
+
+    @property
+    def failed(self):
+        """
+        :return: list of the ids of the videos whose last run failed
+        """
+        return [k for k, e in self._entries.items() if e["status"] not in self.COMPLETED_STATUSES]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,26 @@
+import threading
+
+import spacy
+
+from subs2network.consts import SPACY_MODEL
+
+# pipes that are not needed for NER and for POS tagging
+SPACY_NER_DISABLE = ('parser', 'tagger', 'textcat')
+SPACY_POS_DISABLE = ('parser', 'ner', 'textcat')
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_spacy_model(disable=(), name=SPACY_MODEL):
+    """
+    Return a process wide spaCy model, the model is loaded only on the first request for each pipes configuration
+    :param disable: names of the pipes that are not needed by the caller
+    :param name: spaCy model name
+    :return: loaded spaCy model
+    """
+    key = (name, frozenset(disable))
+    with _models_lock:
+        if key not in _models:
+            _models[key] = spacy.load(name, disable=list(disable))
+        return _models[key]
@@ -1,18 +1,20 @@
 import logging
 import os
 import re
+from bisect import bisect_left, bisect_right
 from collections import Counter, defaultdict
 from itertools import chain
 
 import networkx as nx
 import pysrt
-import spacy
-from nltk.tag import StanfordNERTagger
 from nltk.tokenize import word_tokenize
 
 from subs2network.consts import IMDB_ID, SUBTITLE_PATH, ROLES_PATH, IMDB_NAME, STANFORD_NLP_JAR, STANFORD_NLP_MODEL, \
-    OUTPUT_PATH, STANFORD_NLP_JAR_URL, STANFORD_NLP_MODEL_URL
+    OUTPUT_PATH, STANFORD_NLP_JAR_URL, STANFORD_NLP_MODEL_URL, SPACY_BATCH_SIZE, SPACY_N_PROCESS
 from subs2network.exceptions import SubtitleNotFound
+from subs2network.ner_cache import NERCache, get_models_version
+from subs2network.ner_pool import get_ner_pool
+from subs2network.spacy_models import get_spacy_model, SPACY_NER_DISABLE
 from subs2network.subtitle_fetcher import SubtitleFetcher
 from subs2network.utils import get_movie_obj, download_file
 from subs2network.video_roles_analyzer import VideoRolesAnalyzer
@@ -29,21 +31,70 @@ class RemoveControlChars(object):
         return self.control_char_re.sub('', s)
 
 
+class RolesTimeline(object):
+    """
+    Roles mentions timeline stored as sorted parallel lists of millisecond timestamps and roles sets, mentions which
+    start at the same time are kept as separate entries
+    """
+
+    def __init__(self):
+        self._timestamps = []
+        self._roles = []
+
+    def add(self, t, roles):
+        """
+        Add roles mentioned at time t to the timeline
+        :param t: the mention time in milliseconds
+        :param roles: set of mentioned (Person, Role) tuples
+        """
+        i = bisect_right(self._timestamps, t)
+        self._timestamps.insert(i, t)
+        self._roles.insert(i, roles)
+
+    def window_end(self, i, span):
+        """
+        Return the index following the last entry which is less than span milliseconds after the i-th entry
+        :param i: the window's first entry index
+        :param span: the window size in milliseconds
+        :rtype: int
+        """
+        return bisect_left(self._timestamps, self._timestamps[i] + span, lo=i + 1)
+
+    def __getitem__(self, i):
+        return self._timestamps[i], self._roles[i]
+
+    def __iter__(self):
+        return zip(self._timestamps, self._roles)
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def __str__(self):
+        return str(list(self))
+
+
 class SubtitleAnalyzer(object):
     """
     Fetch and analyze subtitle of a movie and use it to construct the connection between the movie various roles
     """
 
-    def __init__(self, subtitle_info_dict, use_top_k_roles=None, ignore_roles_names=None):
+    def __init__(self, subtitle_info_dict, use_top_k_roles=None, ignore_roles_names=None, batch_size=SPACY_BATCH_SIZE,
+                 n_process=SPACY_N_PROCESS, use_ner_cache=True):
         """
         Construct the SubtitleAnalyzer and create the video's role time line based
         :param subtitle_info_dict: dict with the video metadata created by the SubtitleFetcher class
         :param use_top_k_roles: use only the top K roles when constructing the movie? (None - to use all roles)
         :param ignore_roles_names: list of roles name to ignore
+        :param batch_size: number of subtitle lines spaCy processes in each batch
+        :param n_process: number of processes spaCy uses to tag the subtitle lines
+        :param use_ner_cache: reuse the NER output of previous runs on the same subtitle file
 
         """
         self._roles = defaultdict(lambda: {"role": None, "first": 0, "last": 0})
         self._interactions = {}
+        self._batch_size = batch_size
+        self._n_process = n_process
+        self._use_ner_cache = use_ner_cache
         if ignore_roles_names is None:
             ignore_roles_names = set()
         download_file(STANFORD_NLP_JAR_URL, STANFORD_NLP_JAR, False)
@@ -55,18 +106,47 @@ class SubtitleAnalyzer(object):
 
         imdb_id = subtitle_info_dict[IMDB_ID].strip('t')
         self._video_role_analyzer = VideoRolesAnalyzer(imdb_id, use_top_k_roles, ignore_roles_names,
-                                                       subtitle_info_dict[ROLES_PATH])
+                                                       subtitle_info_dict[ROLES_PATH], batch_size=batch_size)
 
         subtitle_srt_path = subtitle_info_dict[SUBTITLE_PATH]
 
-        self._subs_entities_timeline_dict = self.create_video_roles_timeline(subtitle_srt_path)
+        self._roles_timeline = self.create_video_roles_timeline(subtitle_srt_path)
 
     def create_video_roles_timeline(self, subtitle_path):
         if subtitle_path is None:
             raise SubtitleNotFound(f"Could not find video's subtitle in path: {subtitle_path}")
         subs = pysrt.open(subtitle_path)
-        subs_entities_timeline_dict = {}
+        roles_timeline = RolesTimeline()
+
+        nlp = get_spacy_model(disable=SPACY_NER_DISABLE)
+        if self._use_ner_cache:
+            ner_cache = NERCache()
+            cache_key = ner_cache.get_key(subtitle_path, get_models_version(nlp))
+            entities = ner_cache.load(cache_key)
+            if entities is None:
+                entities = self._get_subtitle_entities(subs, nlp)
+                ner_cache.save(cache_key, *entities)
+        else:
+            entities = self._get_subtitle_entities(subs, nlp)
+        entities_nltk, entities_spacy, brackets = entities
+
+        for s, e_n, e_s, b in zip(subs, entities_nltk, entities_spacy, brackets):
+            roles = self._video_role_analyzer.find_roles_names_in_text_ner(e_n, e_s)
+            for item in b:
+                roles.update(self._video_role_analyzer.find_roles_names_in_text(item))
+            # role_counter.update(roles)
+            if len(roles) > 0:
+                roles_timeline.add(s.start.ordinal, roles)
+        logging.debug(str(roles_timeline))
+        return roles_timeline
 
+    def _get_subtitle_entities(self, subs, nlp):
+        """
+        Tag the subtitle lines using Stanford NER and spaCy and find the bracketed texts in each line
+        :param subs: pysrt SubRipFile
+        :param nlp: spaCy model with a NER pipe
+        :return: tuple of (stanford entities, spacy entities, brackets) lists with an item for each subtitle line
+        """
         re_brackets_split = re.compile(r"(\[.*?\]|.*?:|^\(.*?\)$)")
         # (\[(.* ?)\] | (.* ?)\: | ^ \((.* ?)\)$)
         cc = RemoveControlChars()
@@ -74,66 +154,92 @@ class SubtitleAnalyzer(object):
         subs_clean = [re.sub(r'<[^<]+?>', '', s) for s in subs_clean]
         brackets = [re_brackets_split.findall(s) for s in subs_clean]
         subs_text = [word_tokenize(s) for s in subs_clean]
-        st = StanfordNERTagger(STANFORD_NLP_MODEL,
-                               encoding='utf-8', path_to_jar=STANFORD_NLP_JAR)
-
-        nlp = spacy.load('en_core_web_sm', disable=['parser', 'tagger', 'textcat'])
-        entities_spacy = [[(ent.text, ent.label_) for ent in nlp(s).ents] for s in subs_clean]
+        docs = nlp.pipe(subs_clean, batch_size=self._batch_size, n_process=self._n_process)
+        entities_spacy = [[(ent.text, ent.label_) for ent in doc.ents] for doc in docs]
 
-        entities_nltk = st.tag_sents(subs_text)
-
-        for s, e_n, e_s, b in zip(subs, entities_nltk, entities_spacy, brackets):
-            roles = self._video_role_analyzer.find_roles_names_in_text_ner(e_n, e_s)
-            for item in b:
-                roles.update(self._video_role_analyzer.find_roles_names_in_text(item))
-            # role_counter.update(roles)
-            if len(roles) > 0:
-                t = s.start.seconds + s.start.minutes * 60
-                subs_entities_timeline_dict[t] = roles
-        logging.debug(str(subs_entities_timeline_dict))
-        return subs_entities_timeline_dict
+        entities_nltk = get_ner_pool().tag_sents(subs_text)
+        return entities_nltk, entities_spacy, brackets
 
     def get_subtitles_entities_links(self, timelaps_seconds):
+        """
+        Construct the actors graph and the roles graph, two roles are linked each time they are mentioned less than
+        timelaps_seconds apart
+        :param timelaps_seconds: the co-occurrence window size in seconds
+        :return: list with the actors graph and the roles graph
+        """
+        return self.get_subtitles_entities_links_windows([timelaps_seconds])[timelaps_seconds]
 
-        timeline = sorted(self._subs_entities_timeline_dict.items(), key=lambda x: x[0])
-        graphs = [nx.Graph(), nx.Graph()]
-        for i, item in enumerate(timeline):
-            t1, entities1 = item
-            self.update_appearances(graphs, entities1, t1)
+    def get_subtitles_entities_links_windows(self, timelaps_seconds_list):
+        """
+        Construct the actors graph and the roles graph of several co-occurrence window sizes in a single pass over
+        the roles timeline
+        :param timelaps_seconds_list: list of co-occurrence window sizes in seconds
+        :return: dict from each window size to a list with the actors graph and the roles graph
+        """
+        windows = sorted(set(timelaps_seconds_list))
+        if not windows:
+            return {}
+        windows_size = [w * 1000 for w in windows]
+        timeline = self._roles_timeline
+        edges = {w: [{}, {}] for w in windows}
+        for i, (t1, entities1) in enumerate(timeline):
             if len(entities1) > 1:
-                edges = self._get_edges(entities1, entities1)
-                self.update_interaction(graphs, edges, t1)
-            for t2, entities2 in timeline[i + 1:]:
-                if t2 - t1 < timelaps_seconds:
-                    edges = self._get_edges(entities1, entities2)
-                    self.update_appearances(graphs, entities1, t1)
-                    self.update_appearances(graphs, entities2, t2)
-                    self.update_interaction(graphs, edges, t2)
-
-                else:
-                    break
-        return graphs
+                roles = self._get_edges(entities1, entities1)
+                for w in windows:
+                    self.update_interaction(edges[w], roles, t1)
+            for j in range(i + 1, timeline.window_end(i, windows_size[-1])):
+                t2, entities2 = timeline[j]
+                roles = self._get_edges(entities1, entities2)
+                # the mentions are linked in every window which is larger than the time between them
+                for w in windows[bisect_right(windows_size, t2 - t1):]:
+                    self.update_interaction(edges[w], roles, t2)
+        nodes = self._get_nodes(timeline)
+        return {w: self._create_graphs(nodes, edges[w]) for w in windows}
 
     @staticmethod
-    def update_appearances(graphs, roles, t):
-        for i, g in enumerate(graphs):
+    def update_interaction(edges, roles, t):
+        """
+        Update the edges of the actors & roles graphs with interactions that occurred at time t
+        :param edges: list of two dicts, for the actors and roles graphs, from (v, u) to [first, last, weight]
+        :param roles: list of interacting ((Person, Role), (Person, Role)) tuples
+        :param t: the interaction time in milliseconds
+        """
+        for i, graph_edges in enumerate(edges):
             for role in roles:
-                r = role[i][IMDB_NAME]
-                if r in g.node:
-                    g.node[r]["last"] = t
+                v, u = role[0][i][IMDB_NAME], role[1][i][IMDB_NAME]
+                e = graph_edges.get((v, u)) or graph_edges.get((u, v))
+                if e is None:
+                    graph_edges[(v, u)] = [t / 1000, t / 1000, 1]
                 else:
-                    g.add_node(r, **{"first": t, "last": t, "role": role[1 - i][IMDB_NAME]})
+                    e[1] = t / 1000
+                    e[2] += 1
 
     @staticmethod
-    def update_interaction(graphs, roles, t):
+    def _get_nodes(timeline):
+        """
+        Return the actors & roles graphs nodes with the time of their first and last mentions
+        :param timeline: RolesTimeline
+        :return: list of two dicts, for the actors and roles graphs, from node to its attributes
+        """
+        nodes = [{}, {}]
+        for i, graph_nodes in enumerate(nodes):
+            for t, roles in timeline:
+                for role in roles:
+                    r = role[i][IMDB_NAME]
+                    if r in graph_nodes:
+                        graph_nodes[r]["last"] = t / 1000
+                    else:
+                        graph_nodes[r] = {"first": t / 1000, "last": t / 1000, "role": role[1 - i][IMDB_NAME]}
+        return nodes
+
+    @staticmethod
+    def _create_graphs(nodes, edges):
+        graphs = [nx.Graph(), nx.Graph()]
         for i, g in enumerate(graphs):
-            for role in roles:
-                v, u = role[0][i][IMDB_NAME], role[1][i][IMDB_NAME]
-                if (v, u) in g.edges:
-                    g.adj[v][u]["last"] = t
-                    g.adj[v][u]["weight"] += 1
-                else:
-                    g.add_edge(v, u, **{"first": t, "last": t, "weight": 1})
+            g.add_nodes_from(nodes[i].items())
+            for (v, u), (first, last, weight) in edges[i].items():
+                g.add_edge(v, u, first=first, last=last, weight=weight)
+        return graphs
 
     def _get_edges(self, l1, l2):
         edges = []
@@ -2,13 +2,13 @@ import logging
 import os
 import pickle
 import types
-import glob
 import babelfish
 from guessit.api import GuessitException
 from subliminal import video, download_best_subtitles, save_subtitles, region
 
-from subs2network.consts import IMDB_ID, VIDEO_NAME, SUBTITLE_PATH, ROLES_PATH, OUTPUT_PATH
+from subs2network.consts import SUBTITLE_PATH, ROLES_PATH, OUTPUT_PATH, CAST_RECORD_SUFFIX
 from subs2network.exceptions import SubtitleNotFound
+from subs2network.subtitle_index import get_subtitle_index, FETCHED, NOT_FOUND
 from subs2network.utils import get_movie_obj
 
 
@@ -20,47 +20,133 @@ class SubtitleFetcher(object):
     analyzed local files
     """
 
-    def __init__(self, video_obj, lang=babelfish.Language("eng")):
+    def __init__(self, video_obj, lang=babelfish.Language("eng"), providers=None, provider_configs=None):
         """
         Class constructor which receives as input a video object of a movie or TV series episode and the language of the
         video
         :param video_obj: video object that contains a movie's or TV series episode's details
         :param lang: the language of the video as babelfish object
+        :param providers: names of the subliminal providers to use (None - to use all providers)
+        :param provider_configs: dict from provider name to its configuration
         :return: None
         """
         self._video_obj = video_obj
         self._lang = lang
+        self._providers = providers
+        self._provider_configs = provider_configs
 
     def load_video_obj(self):
         if isinstance(self._video_obj, types.GeneratorType):
             self._video_obj = next(self._video_obj)
 
-    def fetch_subtitle(self, path):
+    def fetch_subtitle(self, path, retry_not_found=False):
         """
         Fetch the subtitle using subliminal or from local file
         :param path: the file path to save the subtitle or to load the subtitle details from
+        :param retry_not_found: search the providers again for videos whose subtitle wasn't found before
         :return:
         :rtype: dict
         """
-
-        p = path + os.path.sep + self.get_video_string() + ".pkl"
-        if not os.path.isfile(p) or not glob.glob(f"{path}/{self._video_obj.name}*.srt"):
+        if not retry_not_found and self.is_not_found(path):
+            logging.debug("%s's subtitle was already not found" % self.get_video_string())
+            raise SubtitleNotFound
+        d = self._get_subtitle_info_dict(path)
+        if d is None:
             self.load_video_obj()
             logging.debug("Fetching  %s's best matched subtitle" % self.get_video_string())
             # This download the best subtitle as SRT file to the current directory
             try:
-                subtitle = download_best_subtitles({self._video_obj}, {self._lang}, hearing_impaired=True)
+                subtitle = download_best_subtitles({self._video_obj}, {self._lang}, hearing_impaired=True,
+                                                   providers=self._providers, provider_configs=self._provider_configs)
                 subtitle = subtitle[self._video_obj]
             except GuessitException:
                 subtitle = []
             if not subtitle:
+                self._save_subtitle_info_dict(path, None, NOT_FOUND)
                 raise SubtitleNotFound
-            save_subtitles(self._video_obj, subtitle, encoding='utf-8', directory=path)
-        self._save_subtitle_info_dict(path)
-        logging.debug("Loading %s metadata from %s" % (self.get_video_string(), p))
+            saved = save_subtitles(self._video_obj, subtitle, encoding='utf-8', directory=path)
+            d = self._save_subtitle_info_dict(path, self._get_saved_srt_path(path, saved))
+        logging.debug("Loaded %s metadata" % self.get_video_string())
+        del d["status"]
+        return d
+
+    def is_fetched(self, path):
+        """
+        Was the video's subtitle already downloaded to path?
+        :param path: the path the subtitles are saved to
+        :return: True if the subtitle and its metadata exist in path
+        :rtype: bool
+        """
+        return self._get_subtitle_info_dict(path) is not None
+
+    def is_not_found(self, path):
+        """
+        Was the video's subtitle already searched for and not found?
+        :param path: the path the subtitles are saved to
+        :return: True if the video's subtitle is indexed as not found
+        :rtype: bool
+        """
+        d = get_subtitle_index(path).get(self.imdb_id, self.get_video_string())
+        return d is not None and d["status"] == NOT_FOUND
+
+    def get_roles_path(self, path):
+        """
+        Return the path of the video's roles cache file, which is known before the subtitle is fetched
+        :param path: the path the subtitles are saved to
+        :rtype: str
+        """
+        d = get_subtitle_index(path).get(self.imdb_id, self.get_video_string())
+        if d is not None and d[ROLES_PATH] is not None:
+            return d[ROLES_PATH]
+        return self._get_cast_record_path(path)
+
+    def _get_cast_record_path(self, path):
+        return path + os.path.sep + self.get_video_string() + CAST_RECORD_SUFFIX
+
+    def _get_subtitle_info_dict(self, path):
+        """
+        Return the video's subtitle metadata from the path's subtitle index, metadata which was saved as a pickle file
+        by previous versions is moved to the index on its first lookup
+        :param path: the path the subtitles are saved to
+        :return: the subtitle's metadata dict or None if the subtitle wasn't fetched
+        :rtype: dict
+        """
+        d = get_subtitle_index(path).get(self.imdb_id, self.get_video_string())
+        if d is None:
+            d = self._load_legacy_subtitle_info_dict(path)
+        if d is None or d["status"] != FETCHED or not os.path.isfile(d[SUBTITLE_PATH]):
+            return None
+        return d
+
+    def _load_legacy_subtitle_info_dict(self, path):
+        p = path + os.path.sep + self.get_video_string() + ".pkl"
+        if not os.path.isfile(p):
+            return None
         with open(p, "rb") as f:
-            # os.chdir(owd)
-            return pickle.load(f)  # test if the subtitle object is loadable
+            d = pickle.load(f)
+        if d[SUBTITLE_PATH] is None:
+            return None
+        logging.debug(f"Moving {self.get_video_string()}'s metadata from {p} to the subtitle index")
+        # the video's pickled IMDb movie is converted to a cast record when the roles are first loaded
+        d = self._save_subtitle_info_dict(path, d[SUBTITLE_PATH], roles_path=d.get(ROLES_PATH))
+        os.remove(p)
+        return d
+
+    def _get_saved_srt_path(self, path, saved_subtitles):
+        """
+        Return the path of the SRT file saved by subliminal
+        :param path: the directory the subtitle was saved to
+        :param saved_subtitles: the subtitles returned by save_subtitles
+        :return: path to the video's subtitles or None
+        :rtype: str
+        """
+        if saved_subtitles:
+            # subliminal names the file after the video with the subtitle's language as suffix
+            name = os.path.splitext(os.path.basename(self._video_obj.name))[0]
+            p = os.path.join(path, f"{name}.{saved_subtitles[0].language}.srt")
+            if os.path.isfile(p):
+                return p
+        return self._get_subtitle_srt_path(path)
 
     def _get_subtitle_srt_path(self, search_path):
         """
@@ -81,24 +167,33 @@ class SubtitleFetcher(object):
                     return search_path + os.path.sep + p
         return None
 
-    def _save_subtitle_info_dict(self, path):
+    def _save_subtitle_info_dict(self, path, subtitle_path, status=FETCHED, roles_path=None):
         """
-        save subtitle's metadata as a dict object to a file using pickle
-        :param path: the path to save the subtitle's metadata dict using cPcikle
+        save subtitle's metadata to the path's subtitle index
+        :param path: the path the subtitles are saved to
+        :param subtitle_path: path to the video's SRT file
+        :param status: the fetch status
+        :param roles_path: path to the video's roles cache file (None - the video's cast record path)
+        :return: the subtitle's metadata dict
+        :rtype: dict
         """
+        if roles_path is None:
+            roles_path = self._get_cast_record_path(path)
+        logging.debug(f"Saving {self.get_video_string()}'s metadata to the subtitle index")
+        index = get_subtitle_index(path)
+        index.put(self.imdb_id, self.get_video_string(), self._video_obj.name, subtitle_path, roles_path, status)
+        return index.get(self.imdb_id, self.get_video_string())
 
-        p = path + os.path.sep + self.get_video_string() + ".pkl"
-        roles_path = path + os.path.sep + self.get_video_string() + "roles.pkl"
+    @property
+    def imdb_id(self):
+        """
+        The video's IMDB id, for TV series episodes the series' IMDB id
+        :rtype: str
+        """
         try:
-            d = {VIDEO_NAME: self._video_obj.name, IMDB_ID: self._video_obj.imdb_id,
-                 SUBTITLE_PATH: self._get_subtitle_srt_path(path), ROLES_PATH: roles_path}
+            return self._video_obj.imdb_id
         except AttributeError:
-            d = {VIDEO_NAME: self._video_obj.name, IMDB_ID: self._video_obj.series_imdb_id,
-                 SUBTITLE_PATH: self._get_subtitle_srt_path(path), ROLES_PATH: roles_path}
-
-        logging.debug(f"Saving {self.get_video_string()}'s metadata to {p}")
-        with open(p, "wb") as f:
-            pickle.dump(d, f)
+            return self._video_obj.series_imdb_id
 
     def get_video_string(self):
         """
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+import time
+
+from subs2network.consts import IMDB_ID, VIDEO_NAME, SUBTITLE_PATH, ROLES_PATH, SUBTITLE_INDEX_NAME
+
+FETCHED = "fetched"
+NOT_FOUND = "not_found"
+
+
+class SubtitleIndex(object):
+    """
+    SQLite index of the fetched subtitles metadata, keyed by the video's IMDB id and representing name. Maps each video
+    to its SRT file, roles cache file and fetch status
+    """
+
+    def __init__(self, path):
+        """
+        Open the index, creating it if needed
+        :param path: path to the index's SQLite file
+        """
+        self._path = path
+        # sqlite connections can't be shared between threads or forked processes
+        self._local = threading.local()
+        with self._get_connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS subtitles (imdb_id TEXT NOT NULL, video_string TEXT NOT NULL, "
+                         "video_name TEXT, subtitle_path TEXT, roles_path TEXT, status TEXT NOT NULL, "
+                         "updated REAL, PRIMARY KEY (imdb_id, video_string))")
+
+    def _get_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self._path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, imdb_id, video_string):
+        """
+        Return the video's subtitle metadata
+        :param imdb_id: the video's IMDB id
+        :param video_string: the video's representing name
+        :return: dict with the video name, IMDB id, subtitle path, roles path and status or None if the video isn't
+         indexed
+        :rtype: dict
+        """
+        row = self._get_connection().execute(
+            "SELECT video_name, subtitle_path, roles_path, status FROM subtitles WHERE imdb_id=? AND video_string=?",
+            (imdb_id or "", video_string)).fetchone()
+        if row is None:
+            return None
+        return {VIDEO_NAME: row[0], IMDB_ID: imdb_id, SUBTITLE_PATH: row[1], ROLES_PATH: row[2], "status": row[3]}
+
+    def put(self, imdb_id, video_string, video_name, subtitle_path, roles_path, status=FETCHED):
+        """
+        Add or update the video's subtitle metadata
+        :param imdb_id: the video's IMDB id
+        :param video_string: the video's representing name
+        :param video_name: the video's name
+        :param subtitle_path: path to the video's SRT file
+        :param roles_path: path to the video's roles cache file
+        :param status: the fetch status, fetched or not_found
+        """
+        with self._get_connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO subtitles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (imdb_id or "", video_string, video_name, subtitle_path, roles_path, status, time.time()))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_subtitle_index(subtitles_path):
+    """
+    Return the subtitle index of a subtitles directory, the index is shared by all the fetchers in the process
+    :param subtitles_path: the directory the subtitles are saved to
+    :return: SubtitleIndex
+    :rtype: SubtitleIndex
+    """
+    path = os.path.abspath(os.path.join(subtitles_path, SUBTITLE_INDEX_NAME))
+    with _indexes_lock:
+        if path not in _indexes:
+            os.makedirs(subtitles_path, exist_ok=True)
+            _indexes[path] = SubtitleIndex(path)
+        return _indexes[path]
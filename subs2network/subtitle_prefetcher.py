@@ -0,0 +1,144 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from subliminal.extensions import provider_manager
+
+from subs2network.consts import SUBTITLE_SLEEP_TIME
+from subs2network.subtitle_fetcher import SubtitleFetcher
+
+
+class RateLimiter(object):
+    """
+    Thread safe limiter which spaces the calls made with the same key at least min_interval seconds apart
+    """
+
+    def __init__(self, min_interval=SUBTITLE_SLEEP_TIME):
+        self._min_interval = min_interval
+        self._next_call = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def wait(self, key):
+        """
+        Block until a call with the given key is allowed
+        :param key: the rate limited resource, such as a provider name
+        """
+        with self._lock:
+            now = time.monotonic()
+            call_time = max(now, self._next_call[key])
+            self._next_call[key] = call_time + self._min_interval
+        if call_time > now:
+            time.sleep(call_time - now)
+
+
+class SubtitlePrefetcher(object):
+    """
+    Fetch the subtitles of upcoming videos in background threads so the analysis does not wait on the subtitles
+    providers. The results are handed over through a bounded queue, which limits how far the fetching runs ahead of
+    the analysis
+    """
+    _DONE = object()
+
+    def __init__(self, videos, subtitles_path, n_threads=4, queue_size=8, providers=None, provider_configs=None,
+                 rate_limiter=None, fetcher_cls=SubtitleFetcher, retry_not_found=False):
+        """
+        Construct the prefetcher, the fetching threads are started by start or when entering the context manager
+        :param videos: iterable of (key, video object) tuples
+        :param subtitles_path: the path to save the subtitles to
+        :param n_threads: number of videos that are fetched at the same time
+        :param queue_size: max number of fetched videos waiting to be consumed
+        :param providers: names of the subliminal providers to use (None - to use all providers)
+        :param provider_configs: dict from provider name to its configuration
+        :param rate_limiter: RateLimiter applied to each of the providers
+        :param fetcher_cls: the class which fetches each video's subtitle, constructed as SubtitleFetcher
+        :param retry_not_found: search the providers again for videos whose subtitle wasn't found before
+        """
+        self._videos = iter(videos)
+        self._videos_lock = threading.Lock()
+        self._subtitles_path = subtitles_path
+        self._n_threads = n_threads
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._providers = providers
+        self._provider_configs = provider_configs
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self._rate_limiter = rate_limiter
+        self._fetcher_cls = fetcher_cls
+        self._retry_not_found = retry_not_found
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for _ in range(self._n_threads):
+            t = threading.Thread(target=self._fetch_videos, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def close(self):
+        """
+        Stop fetching, subtitles which are being downloaded are discarded
+        """
+        self._stop.set()
+        while any(t.is_alive() for t in self._threads):
+            try:
+                self._queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        """
+        Iterate over the fetched videos in the order their fetching completed
+        :return: generator of (key, subtitle info dict, exception) tuples, the exception is None if the fetch succeeded
+        """
+        running = len(self._threads)
+        while running:
+            item = self._queue.get()
+            if item is self._DONE:
+                running -= 1
+            else:
+                yield item
+
+    def _next_video(self):
+        with self._videos_lock:
+            return next(self._videos, None)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _fetch_videos(self):
+        try:
+            while not self._stop.is_set():
+                video = self._next_video()
+                if video is None:
+                    break
+                key, video_obj = video
+                self._put(self._fetch(key, video_obj))
+        finally:
+            self._put(self._DONE)
+
+    def _fetch(self, key, video_obj):
+        try:
+            sf = self._fetcher_cls(video_obj, providers=self._providers, provider_configs=self._provider_configs)
+            # known misses are raised from the subtitle index without querying the providers
+            if not sf.is_fetched(self._subtitles_path) and (self._retry_not_found or
+                                                            not sf.is_not_found(self._subtitles_path)):
+                for provider in self._providers or provider_manager.names():
+                    self._rate_limiter.wait(provider)
+            return key, sf.fetch_subtitle(self._subtitles_path, self._retry_not_found), None
+        except Exception as e:
+            logging.debug(f"Failed prefetching {key}: {e!r}")
+            return key, None, e
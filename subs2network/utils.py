@@ -12,7 +12,7 @@ from sendgrid.helpers.mail import Mail, Email, Content
 from subliminal import video
 from tqdm import tqdm
 import glob
-from subs2network.consts import OUTPUT_PATH
+from subs2network.consts import OUTPUT_PATH, CAST_RECORD_SUFFIX
 from turicreate import SFrame
 
 def send_email(send_to, subject, mail_content):
@@ -119,7 +119,9 @@ def delete_movies_results(p):
         path = os.path.join(p, movie)
         if glob.glob(os.path.join(path, f"subtitles/*.srt")):
             try:
-                os.remove(glob.glob(os.path.join(path, f"subtitles/{movie}*roles.pkl"))[0])
+                for cast_path in glob.glob(os.path.join(path, f"subtitles/{movie}*roles.pkl")) + glob.glob(
+                        os.path.join(path, f"subtitles/{movie}*{CAST_RECORD_SUFFIX}")):
+                    os.remove(cast_path)
                 os.remove(os.path.join(path, f"{movie}.json"))
             except FileNotFoundError:
                 pass
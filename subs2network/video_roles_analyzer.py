@@ -1,52 +1,105 @@
 import logging
 import os
-import pickle
 import re
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
-import spacy
 import stop_words
 import tmdbsimple as tmdb
 from fuzzywuzzy import process
+from fuzzywuzzy.utils import full_process
 from imdb import IMDb
 from nltk.corpus import names
 
-from subs2network.consts import IMDB_NAME, IMDB_CAST, MIN_NAME_SIZE
+from subs2network.cast_records import load_cast_record, save_cast_record, movie_to_cast_record, \
+    cast_record_to_cast_list
+from subs2network.consts import IMDB_NAME, MIN_NAME_SIZE, SPACY_BATCH_SIZE, MATCH_ROLES_CACHE_SIZE, IMDB_OFFLINE
 from subs2network.exceptions import CastNotFound
+from subs2network.imdb_cast_index import imdb_cast_index
+from subs2network.spacy_models import get_spacy_model, SPACY_POS_DISABLE
 from subs2network.utils import to_iterable
 
-# import spacy
+try:
+    from rapidfuzz import fuzz as rapidfuzz_fuzz
+except ImportError:
+    rapidfuzz_fuzz = None
 
 tmdb.API_KEY = os.getenv('TMD_API_KEY')
 
 
+def extract_best_match(query, choices, score_cutoff=90):
+    """
+    Find the choice which best matches the query, rapidfuzz is used when it is installed since it is a faster
+    implementation of fuzzywuzzy's scorer. Its scores are processed and rounded as fuzzywuzzy's, so both return the
+    same match
+    :param query: text to match
+    :param choices: list of strings to match the query against
+    :param score_cutoff: minimal matching score
+    :return: the best matching choice or None if no choice scored above the cutoff
+    :rtype: str
+    """
+    if rapidfuzz_fuzz is None:
+        res = process.extractOne(query, choices, score_cutoff=score_cutoff)
+        if res is None:
+            return None
+        return res[0]
+
+    processed_query = full_process(query, force_ascii=True)
+    best_match, best_score = None, -1
+    for choice in choices:
+        # scores which round up to the cutoff must not be skipped by rapidfuzz's cutoff
+        score = rapidfuzz_fuzz.WRatio(processed_query, full_process(choice, force_ascii=True),
+                                      score_cutoff=score_cutoff - 0.5)
+        score = int(round(score))
+        # as fuzzywuzzy's extractOne, the first choice with the best rounded score is returned
+        if score >= score_cutoff and score > best_score:
+            best_match, best_score = choice, score
+    return best_match
+
+
 class VideoRolesAnalyzer(object):
     """
     Identifies roles in text using roles' information from IMDB
     """
 
-    def __init__(self, imdb_id, use_top_k_roles=None, ignore_roles_names=None, roles_path=None):
+    def __init__(self, imdb_id, use_top_k_roles=None, ignore_roles_names=None, roles_path=None,
+                 batch_size=SPACY_BATCH_SIZE, n_process=1, match_cache_size=MATCH_ROLES_CACHE_SIZE,
+                 offline=IMDB_OFFLINE):
         """
         Construct VideoRolesAnalyzer object which can get text and identify the characters names in the text
         :param imdb_id: imdb
         :param remove_roles_names: list of roles names to ignore when analyzing the roles dict.
+        :param batch_size: number of roles names spaCy processes in each batch
+        :param n_process: number of processes spaCy uses to POS tag the roles names
+        :param match_cache_size: max number of mentions whose matched role is cached by match_roles
+        :param offline: use only the local IMDb cast index and skip TMDb, instead of falling back to IMDb's website
         """
 
         self._roles_dict = defaultdict(set)
+        self._roles_re = None
+        self._matched_roles = OrderedDict()
+        self._match_cache_size = match_cache_size
         self._roles_path = None
         if roles_path is not None:
             self._roles_path = roles_path
         self.imdb_id = imdb_id
-        if self._roles_path is None or not os.path.exists(self._roles_path):
-            self._imdb_movie = IMDb().get_movie(imdb_id)
-            with open(self._roles_path, "wb") as f:
-                pickle.dump(self._imdb_movie, f)
-        else:
-            with open(self._roles_path, "rb") as f:
-                self._imdb_movie = pickle.load(f)
+        self._cast_record = None
+        if self._roles_path is not None:
+            self._cast_record = load_cast_record(self._roles_path)
+        if self._cast_record is None:
+            if imdb_cast_index.exists:
+                self._cast_record = imdb_cast_index.get_cast_record(imdb_id)
+            if self._cast_record is None:
+                if offline:
+                    raise CastNotFound
+                self._cast_record = movie_to_cast_record(imdb_id, IMDb().get_movie(imdb_id))
+            if self._roles_path is not None:
+                save_cast_record(self._roles_path, self._cast_record)
+        self._offline = offline
         self._stop_words_english = set(stop_words.get_stop_words("english")) - set([n.lower() for n in names.words()])
         self._use_top_k_roles = {}
         self._ignore_roles_names = set(ignore_roles_names)
+        self._batch_size = batch_size
+        self._n_process = n_process
         self._init_roles_dict(use_top_k_roles)
 
     def get_tmdb_cast(self):
@@ -71,17 +124,43 @@ class VideoRolesAnalyzer(object):
         :return:
         """
 
-        re_possessive = re.compile(r"(\w+\'s\s+\w+|\w+s\'\s+\w+)")
-        try:
-            cast_list = self._imdb_movie[IMDB_CAST]
-        except KeyError:
+        cast_list = cast_record_to_cast_list(self._cast_record)
+        if cast_list is None:
             raise CastNotFound
         if use_top_k_roles is not None:
             cast_list = cast_list[:use_top_k_roles]
-        try:
-            tmdb_cast = self.get_tmdb_cast()
-        except:
-            tmdb_cast = {}
+        tmdb_cast = {}
+        if not self._offline and tmdb.API_KEY is not None:
+            try:
+                tmdb_cast = self.get_tmdb_cast()
+            except:
+                pass
+        cast_roles = list(self._get_cast_roles(cast_list, remove_possessives))
+        # only the POS tags of the roles names are needed
+        nlp = get_spacy_model(disable=SPACY_POS_DISABLE)
+        docs = nlp.pipe([role[IMDB_NAME] for i, p, role in cast_roles], batch_size=self._batch_size,
+                        n_process=self._n_process)
+        for (i, p, role), doc in zip(cast_roles, docs):
+            adj = False
+            for token in doc:
+                if token.pos_ == "ADJ":
+                    adj = True
+            if not adj or len(doc) == 1 or i < 4:
+                if p[IMDB_NAME] in tmdb_cast:
+                    tmdb_role = tmdb_cast[p[IMDB_NAME]]
+                    if len(tmdb_role) > len(role[IMDB_NAME]):
+                        role[IMDB_NAME] = tmdb_role
+                self._add_role_to_roles_dict(p, role)
+
+    @staticmethod
+    def _get_cast_roles(cast_list, remove_possessives):
+        """
+        Iterate over the cast roles that can be added to the roles dict, stops at the first uncredited role
+        :param cast_list: list of IMDB cast Person objects
+        :param remove_possessives: skip roles name which contains possessives, such as Andy's Wife
+        :return: generator of (cast index, Person, Role) tuples
+        """
+        re_possessive = re.compile(r"(\w+\'s\s+\w+|\w+s\'\s+\w+)")
         for i, p in enumerate(cast_list):
             for role in to_iterable(p.currentRole):
 
@@ -93,19 +172,7 @@ class VideoRolesAnalyzer(object):
                     if remove_possessives and len(re_possessive.findall(role[IMDB_NAME])) > 0:
                         logging.info("Skipping role with possessive name - %s" % role[IMDB_NAME])
                         continue
-                    nlp = spacy.load('en_core_web_sm')
-
-                    doc = nlp(role[IMDB_NAME])
-                    adj = False
-                    for token in doc:
-                        if token.pos_ == "ADJ":
-                            adj = True
-                    if not adj or len(doc) == 1 or i < 4:
-                        if p[IMDB_NAME] in tmdb_cast:
-                            tmdb_role = tmdb_cast[p[IMDB_NAME]]
-                            if len(tmdb_role) > len(role[IMDB_NAME]):
-                                role[IMDB_NAME] = tmdb_role
-                        self._add_role_to_roles_dict(p, role)
+                    yield i, p, role
 
     def _add_role_to_roles_dict(self, person, role):
         role_name = role[IMDB_NAME]
@@ -137,6 +204,19 @@ class VideoRolesAnalyzer(object):
                     self._roles_dict[part].add((person, role))
 
             self._roles_dict[name_part].add((person, role))
+            # the roles names regex and the matched mentions must be rebuilt to include the new names
+            self._roles_re = None
+            self._matched_roles.clear()
+
+    @property
+    def roles_regex(self):
+        """
+        Regex which matches any of the roles names parts, compiled once and rebuilt only after the roles dict changes
+        :return: compiled roles names regex
+        """
+        if self._roles_re is None:
+            self._roles_re = re.compile("(%s)" % "|".join([fr"\b{r}\b" for r in self._roles_dict.keys()]))
+        return self._roles_re
 
     def find_roles_names_in_text(self, txt):
         """
@@ -149,9 +229,7 @@ class VideoRolesAnalyzer(object):
             return matched_roles
 
         txt = txt.strip().lower()
-        s = "(%s)" % "|".join([fr"\b{r}\b" for r in self._roles_dict.keys()])
-
-        roles_in_text = set(re.findall(s, txt))
+        roles_in_text = set(self.roles_regex.findall(txt))
 
         for r in roles_in_text:
             role = self.match_roles(r)
@@ -187,6 +265,22 @@ class VideoRolesAnalyzer(object):
         return matched_roles
 
     def match_roles(self, raw_txt):
+        """
+        Match a mention in the text to a role, the same mentions recur throughout the subtitle so the results of the
+        most recent mentions are cached
+        :param raw_txt: the mention text
+        :return: the matched (Person, Role) tuple or None
+        """
+        try:
+            role = self._matched_roles.pop(raw_txt)
+        except KeyError:
+            role = self._match_roles(raw_txt)
+            if len(self._matched_roles) >= self._match_cache_size:
+                self._matched_roles.popitem(last=False)
+        self._matched_roles[raw_txt] = role
+        return role
+
+    def _match_roles(self, raw_txt):
         txt = raw_txt.lower().split()
         for n in txt:
             if n in self._roles_dict:
@@ -194,11 +288,9 @@ class VideoRolesAnalyzer(object):
                     return list(self._roles_dict[n])[0]
 
                 choices = {role[IMDB_NAME]: (actor, role) for actor, role in self._roles_dict[n]}
-                try:
-                    m = process.extractOne(raw_txt, choices.keys(), score_cutoff=90)[0]
+                m = extract_best_match(raw_txt, choices.keys())
+                if m is not None:
                     return choices[m]
-                except TypeError:
-                    pass
 
     def find_roles_names_in_text_stanford_ner(self, classified_text):
         """
@@ -228,7 +320,7 @@ class VideoRolesAnalyzer(object):
         Return the video IMDB rating
         :return: Video's IMDB rating
         """
-        return self._imdb_movie.data["rating"]
+        return self._cast_record["rating"]
 
 
 if __name__ == "__main__":
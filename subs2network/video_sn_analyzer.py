@@ -1,7 +1,9 @@
 import networkx as nx
-from subs2network.consts import ROLES_GRAPH, ACTORS_GRAPH, IMDB_RATING, VIDEO_NAME, MOVIE_YEAR
+from subs2network.consts import ROLES_GRAPH, ACTORS_GRAPH, IMDB_RATING, VIDEO_NAME, MOVIE_YEAR, \
+    CENTRALITY_SAMPLING_THRESHOLD
 import numpy as np
 from subs2network.utils import add_prefix_to_dict_keys
+from subs2network.graph_features import GraphFeatures
 
 from subs2network.subtitle_fetcher import SubtitleFetcher
 from subs2network.subtitle_analyzer import SubtitleAnalyzer
@@ -10,15 +12,26 @@ from subs2network.utils import get_movie_obj
 
 class VideoSnAnalyzer(object):
     def __init__(self, video_name, entities_links_dict, video_rating=0):
+        """
+        :param video_name: the video's name
+        :param entities_links_dict: list with the actors graph and the roles graph, or a dict from co-occurrence window
+        size to such list
+        :param video_rating: the video's rating
+        """
+        if not isinstance(entities_links_dict, dict):
+            entities_links_dict = {None: entities_links_dict}
         self._entities_dict = entities_links_dict
         self._video_name = video_name
         self._video_rating = video_rating
 
-    def construct_social_network_graph(self, graph_type=ROLES_GRAPH, min_weight=2):
+    def construct_social_network_graph(self, graph_type=ROLES_GRAPH, min_weight=2, timelaps_seconds=None):
+        if timelaps_seconds is None:
+            timelaps_seconds = next(iter(self._entities_dict))
+        entities_links = self._entities_dict[timelaps_seconds]
         if graph_type == ROLES_GRAPH:
-            g = self._entities_dict[1]
+            g = entities_links[1]
         elif graph_type == ACTORS_GRAPH:
-            g = self._entities_dict[0]
+            g = entities_links[0]
         else:
             raise Exception("Unsupported graph type %s" % graph_type)
 
@@ -28,16 +41,35 @@ class VideoSnAnalyzer(object):
         g.graph[VIDEO_NAME] = self._video_name
         return g
 
+    def construct_social_network_graphs(self, graph_type=ROLES_GRAPH, min_weight=2):
+        """
+        Construct the video's social network graph for each of the co-occurrence window sizes
+        :return: dict from window size to graph
+        """
+        return {w: self.construct_social_network_graph(graph_type, min_weight, w) for w in self.windows}
+
+    @property
+    def windows(self):
+        return list(self._entities_dict.keys())
+
     @staticmethod
-    def get_features_dict(g, calculate_edges_features=False):
+    def get_features_dict(g, calculate_edges_features=False, sampling_threshold=CENTRALITY_SAMPLING_THRESHOLD):
+        """
+        :param g: the graph
+        :param calculate_edges_features: add the weight of each edge
+        :param sampling_threshold: for graphs with more nodes, closeness and betweenness are estimated from sampled
+        pivots (None - always compute the exact values)
+        :return: dict of the graph's features
+        """
         if len(g.edges()) == 0:
             return None
         d = {"edges_number": len(g.edges()), "nodes_number": len(g.nodes())}
 
+        features = GraphFeatures.from_graph(g, sampling_threshold)
         d.update(add_prefix_to_dict_keys(nx.degree(g, g.nodes()), "degree"))
-        d.update(add_prefix_to_dict_keys(nx.closeness_centrality(g), "closeness"))
-        d.update(add_prefix_to_dict_keys(nx.pagerank(g), "pagerank"))
-        d.update(add_prefix_to_dict_keys(nx.betweenness_centrality(g), "betweenness"))
+        d.update(add_prefix_to_dict_keys(features.to_dict(features.closeness()), "closeness"))
+        d.update(add_prefix_to_dict_keys(features.to_dict(features.pagerank(weight="weight")), "pagerank"))
+        d.update(add_prefix_to_dict_keys(features.to_dict(features.betweenness()), "betweenness"))
         d.update(add_prefix_to_dict_keys(VideoSnAnalyzer.get_nodes_average_weights(g), "avg-weight"))
 
         if calculate_edges_features:
@@ -3,10 +3,12 @@ from subs2network.video_sn_analyzer import VideoSnAnalyzer
 import glob
 import json
 import logging
+import multiprocessing
 import os
+import time
 import traceback
 from collections import Counter
-from distutils.dir_util import copy_tree
+from multiprocessing.util import Finalize
 
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -20,11 +22,19 @@ from tqdm import tqdm
 from turicreate import SFrame
 
 from subs2network.consts import EPISODE_NAME, DATA_PATH, EPISODE_RATING, EPISODE_NUMBER, ROLES_GRAPH, SEASON_NUMBER, \
-    ACTORS_GRAPH, OUTPUT_PATH, MOVIE_YEAR, MAX_YEAR, SERIES_NAME, VIDEO_NAME, SRC_ID, DST_ID, WEIGHT, IMDB_RATING, BASEPATH
+    ACTORS_GRAPH, OUTPUT_PATH, MOVIE_YEAR, MAX_YEAR, SERIES_NAME, VIDEO_NAME, SRC_ID, DST_ID, WEIGHT, IMDB_RATING, \
+    BASEPATH, SAVE_GRAPH_FILES
+from subs2network.cast_records import warm_cast_records
+from subs2network.corpus_store import get_corpus_store
 from subs2network.exceptions import SubtitleNotFound, CastNotFound
+from subs2network.imdb_cast_index import imdb_cast_index
 from subs2network.imdb_dataset import imdb_data
+from subs2network.ner_pool import get_ner_pool
+from subs2network.run_manifest import RunManifest, DONE, EXISTS, FAILED, ERROR
+from subs2network.spacy_models import get_spacy_model, SPACY_NER_DISABLE, SPACY_POS_DISABLE
 from subs2network.subtitle_analyzer import SubtitleAnalyzer
 from subs2network.subtitle_fetcher import SubtitleFetcher
+from subs2network.subtitle_prefetcher import SubtitlePrefetcher
 from subs2network.utils import get_movie_obj, get_episode_obj
 
 logging.basicConfig(level=logging.ERROR)
@@ -95,39 +105,46 @@ def get_person_movies_graphs(actor_name, filmography, person_type="actors", min_
             break
         title = title.replace('.', '').replace('/', '')
         movie_name = f"{title} ({year})"
-        # try:
+        store = get_corpus_store(OUTPUT_PATH)
+        video_ids = store.get_video_ids("movies", title) or import_movie_graphs(title)
+        if video_ids:
+            print(f"Link: {actor_name} - {title}")
+            store.add_person_videos(person_type, actor_name, video_ids)
+            continue
         create_dirs("movies", title)
 
         subtitles_path = f"{BASEPATH}/subtitles"
-        graph_path = f"{OUTPUT_PATH}/movies/{title}/"
-        if not os.path.exists(f"{OUTPUT_PATH}/{person_type}/{actor_name}/json/{title}.json"):
-            if not os.path.exists(f"{graph_path}/{title}.json"):
-                try:
-                    g = get_movie_graph(movie_name, title, year, m_id, subtitles_path, use_top_k_roles=use_top_k_roles,
-                                        timelaps_seconds=timelaps_seconds, rating=imdb_data.get_movie_rating(m_id),
-                                        min_weight=min_weight, ignore_roles_names=ignore_roles_names)
-                    yield g
-                except CastNotFound:
-                    logging.error(f"{actor_name} - {title}")
-                    logging.error(traceback.format_exc())
-                except AttributeError:
-                    logging.error(f"{actor_name} - {title}")
-                    logging.error(traceback.format_exc())
-                except SubtitleNotFound:
-                    logging.error(f"{actor_name} - {title}")
-                    logging.error(traceback.format_exc())
-                except UnicodeEncodeError:
-                    logging.error(f"{actor_name} - {title}")
-                    logging.error(traceback.format_exc())
-                except KeyError:
-                    logging.error(f"{actor_name} - {title}")
-                    logging.error(traceback.format_exc())
-            else:
-                print(f"Copy: {actor_name} - {title}")
-                copy_tree(f"{OUTPUT_PATH}/movies/{title}/json",
-                          f"{OUTPUT_PATH}/{person_type}/{actor_name}/json")
-                copy_tree(f"{OUTPUT_PATH}/movies/{title}/graphs",
-                          f"{OUTPUT_PATH}/{person_type}/{actor_name}/graphs")
+        try:
+            g = get_movie_graph(movie_name, title, year, m_id, subtitles_path, use_top_k_roles=use_top_k_roles,
+                                timelaps_seconds=timelaps_seconds, rating=imdb_data.get_movie_rating(m_id),
+                                min_weight=min_weight, ignore_roles_names=ignore_roles_names)
+            yield g
+        except CastNotFound:
+            logging.error(f"{actor_name} - {title}")
+            logging.error(traceback.format_exc())
+        except AttributeError:
+            logging.error(f"{actor_name} - {title}")
+            logging.error(traceback.format_exc())
+        except SubtitleNotFound:
+            logging.error(f"{actor_name} - {title}")
+            logging.error(traceback.format_exc())
+        except UnicodeEncodeError:
+            logging.error(f"{actor_name} - {title}")
+            logging.error(traceback.format_exc())
+        except KeyError:
+            logging.error(f"{actor_name} - {title}")
+            logging.error(traceback.format_exc())
+
+
+def import_movie_graphs(title):
+    """
+    Add the graphs of a movie which was saved only as JSON files to the corpus store
+    :param title: the movie's title
+    :return: the ids of the movie's graphs in the store
+    :rtype: list
+    """
+    return get_corpus_store(OUTPUT_PATH).import_json_graphs("movies", title,
+                                                           glob.glob(f"{OUTPUT_PATH}/movies/{title}/json/*.json"))
 
 
 def save_graphs_features(graphs_list, features_path, remove_unintresting_features, sep="\t"):
@@ -186,15 +203,32 @@ def draw_graphs(graphs_list, figures_path, output_format="png"):
 
 
 def get_movie_graph(name, title, year, imdb_id, subtitles_path, use_top_k_roles=None, timelaps_seconds=60,
-                    min_weight=2, rating=None, ignore_roles_names=None):
+                    min_weight=2, rating=None, ignore_roles_names=None, retry_not_found=False):
+    va = _get_movie_video_sn_analyzer(name, title, year, imdb_id, subtitles_path, use_top_k_roles,
+                                      timelaps_seconds, rating, ignore_roles_names=ignore_roles_names,
+                                      retry_not_found=retry_not_found)
+    return _construct_movie_graphs(va, title, year, min_weight)
+
+
+def get_movie_windows_graphs(name, title, year, imdb_id, subtitles_path, timelaps_seconds_list, use_top_k_roles=None,
+                             min_weight=2, rating=None, ignore_roles_names=None):
+    """
+    Returns the movie's graphs for several co-occurrence window sizes while analyzing the subtitle only once
+    :param timelaps_seconds_list: list of co-occurrence window sizes in seconds
+    :return: dict from window size to the movie's graphs tuple
+    """
     va = _get_movie_video_sn_analyzer(name, title, year, imdb_id, subtitles_path, use_top_k_roles,
-                                      timelaps_seconds, rating, ignore_roles_names=ignore_roles_names)
-    g = va.construct_social_network_graph(ROLES_GRAPH, min_weight)
+                                      list(timelaps_seconds_list), rating, ignore_roles_names=ignore_roles_names)
+    return {w: _construct_movie_graphs(va, title, year, min_weight, w) for w in va.windows}
+
+
+def _construct_movie_graphs(va, title, year, min_weight, timelaps_seconds=None):
+    g = va.construct_social_network_graph(ROLES_GRAPH, min_weight, timelaps_seconds)
     g.graph[VIDEO_NAME] = title
     g.graph[MOVIE_YEAR] = year
     g.graph[IMDB_RATING] = va.video_rating
 
-    g_r = va.construct_social_network_graph(ACTORS_GRAPH, min_weight)
+    g_r = va.construct_social_network_graph(ACTORS_GRAPH, min_weight, timelaps_seconds)
     g_r.graph[VIDEO_NAME] = f"{title} - roles"
     g_r.graph[MOVIE_YEAR] = year
     g_r.graph[IMDB_RATING] = va.video_rating
@@ -218,10 +252,10 @@ def get_episode_graph(epiosde_name, series_name, season_number, episode_number,
 
 
 def _get_movie_video_sn_analyzer(name, title, year, imdb_id, subtitles_path, use_top_k_roles,
-                                 timelaps_seconds, rating=None, ignore_roles_names=None):
+                                 timelaps_seconds, rating=None, ignore_roles_names=None, retry_not_found=False):
     movie = get_movie_obj(name, title, year, imdb_id)
     return _fetch_and_analyze_subtitle(movie, subtitles_path, use_top_k_roles, timelaps_seconds, rating,
-                                       ignore_roles_names=ignore_roles_names)
+                                       ignore_roles_names=ignore_roles_names, retry_not_found=retry_not_found)
 
 
 def _get_series_episode_video_sn_analyzer(epiosde_name, series_name, season_number, episode_number, episode_name,
@@ -234,23 +268,33 @@ def _get_series_episode_video_sn_analyzer(epiosde_name, series_name, season_numb
 
 def analyze_subtitle(name, subs_dict, use_top_k_roles, timelaps_seconds, imdb_rating=None):
     sa = SubtitleAnalyzer(subs_dict, use_top_k_roles=use_top_k_roles)
-    e = sa.get_subtitles_entities_links(timelaps_seconds=timelaps_seconds)
+    e = _get_subtitles_entities_links(sa, timelaps_seconds)
     if imdb_rating is None:
         imdb_rating = sa.imdb_rating
     return VideoSnAnalyzer(name, e, imdb_rating)
 
 
 def _fetch_and_analyze_subtitle(video_obj, subtitle_path, use_top_k_roles, timelaps_seconds, imdb_rating=None,
-                                ignore_roles_names=None):
+                                ignore_roles_names=None, retry_not_found=False):
     sf = SubtitleFetcher(video_obj)
-    d = sf.fetch_subtitle(subtitle_path)
+    d = sf.fetch_subtitle(subtitle_path, retry_not_found)
     sa = SubtitleAnalyzer(d, use_top_k_roles=use_top_k_roles, ignore_roles_names=ignore_roles_names)
-    e = sa.get_subtitles_entities_links(timelaps_seconds=timelaps_seconds)
+    e = _get_subtitles_entities_links(sa, timelaps_seconds)
     if imdb_rating is None:
         imdb_rating = sa.imdb_rating
     return VideoSnAnalyzer(video_obj.name, e, imdb_rating)
 
 
+def _get_subtitles_entities_links(sa, timelaps_seconds):
+    """
+    Construct the subtitle's entities links for a single window size or, if a list of window sizes is given, a dict
+    from each window size to its entities links
+    """
+    if isinstance(timelaps_seconds, (list, tuple, set)):
+        return sa.get_subtitles_entities_links_windows(timelaps_seconds)
+    return sa.get_subtitles_entities_links(timelaps_seconds=timelaps_seconds)
+
+
 def draw_graph(g, outpath, graph_layout=nx.spring_layout):
     pos = graph_layout(g)
     plt.figure(num=None, figsize=(15, 15), dpi=150)
@@ -342,6 +386,9 @@ def get_unintresting_features_names(features_dicts, min_freq=5):
 
 
 def create_dirs(t, name):
+    # by default the graphs are written only to the corpus store
+    if not SAVE_GRAPH_FILES:
+        return
     os.makedirs(f"{OUTPUT_PATH}/{t}/{name}", exist_ok=True)
     os.makedirs(f"{OUTPUT_PATH}/{t}/{name}/csv", exist_ok=True)
     os.makedirs(f"{OUTPUT_PATH}/{t}/{name}/json", exist_ok=True)
@@ -350,6 +397,7 @@ def create_dirs(t, name):
 
 
 def generate_series_graphs(name, s_id, seasons_set, episodes_set):
+    os.makedirs(f"{OUTPUT_PATH}/series/{name}", exist_ok=True)
     create_dirs("series", name)
     graphs = []
     for g in get_tvseries_graphs(name, s_id, seasons_set, episodes_set, f"{BASEPATH}/subtitles"):
@@ -363,28 +411,37 @@ def generate_series_graphs(name, s_id, seasons_set, episodes_set):
 
 
 def generate_actor_movies_graphs(name, ignore_roles_names, filmography):
-    create_dirs("actors", name)
+    os.makedirs(f"{OUTPUT_PATH}/actors/{name}", exist_ok=True)
     graphs = get_person_movies_graphs(name, filmography, "actors", min_movies_number=None,
                                       ignore_roles_names=ignore_roles_names)
 
     for g in graphs:
-        save_output(g, "actors", name)
-        save_output(g, "movies", g[0].graph["movie_name"])
+        video_ids = save_output(g, "movies", g[0].graph[VIDEO_NAME])
+        get_corpus_store(OUTPUT_PATH).add_person_videos("actors", name, video_ids)
 
 
 def generate_director_movies_graphs(name, ignore_roles_names):
-    create_dirs("directors", name)
+    os.makedirs(f"{OUTPUT_PATH}/directors/{name}", exist_ok=True)
     graphs = get_person_movies_graphs(name, ["director"], "directors", min_movies_number=None,
                                       ignore_roles_names=ignore_roles_names)
     for g in graphs:
-        save_output(g, "directors", name)
-        save_output(g, "movies", g[0].graph["movie_name"])
+        video_ids = save_output(g, "movies", g[0].graph[VIDEO_NAME])
+        get_corpus_store(OUTPUT_PATH).add_person_videos("directors", name, video_ids)
 
 
 def save_output(graphs, data_type, name):
-    save_graphs_to_csv(graphs, f"{OUTPUT_PATH}/{data_type}/{name}/csv")
-    draw_graphs(graphs, f"{OUTPUT_PATH}/{data_type}/{name}/graphs")
-    save_graphs_to_json(graphs, f"{OUTPUT_PATH}/{data_type}/{name}/json")
+    """
+    Add the graphs to the corpus store and save their files
+    :return: the graphs' ids in the corpus store
+    :rtype: list
+    """
+    store = get_corpus_store(OUTPUT_PATH)
+    video_ids = [store.put_graph(g, data_type, name) for g in graphs]
+    if SAVE_GRAPH_FILES:
+        save_graphs_to_csv(graphs, f"{OUTPUT_PATH}/{data_type}/{name}/csv")
+        draw_graphs(graphs, f"{OUTPUT_PATH}/{data_type}/{name}/graphs")
+        save_graphs_to_json(graphs, f"{OUTPUT_PATH}/{data_type}/{name}/json")
+    return video_ids
 
 
 def save_graphs_outputs(graphs, name):
@@ -401,7 +458,7 @@ def get_black_list():
         return None
 
 
-def generate_movie_graph(movie_title, year, imdb_id, additional_data=None):
+def generate_movie_graph(movie_title, year, imdb_id, additional_data=None, retry_not_found=False):
     rating = None
     if additional_data:
         rating = additional_data["averageRating"]
@@ -410,12 +467,15 @@ def generate_movie_graph(movie_title, year, imdb_id, additional_data=None):
     create_dirs("movies", movie_title)
     graphs = get_movie_graph(f"{movie_title} ({year})", movie_title, year, imdb_id,
                              f"{BASEPATH}/subtitles", use_top_k_roles=None,
-                             min_weight=3, rating=rating, ignore_roles_names=get_black_list())
+                             min_weight=3, rating=rating, ignore_roles_names=get_black_list(),
+                             retry_not_found=retry_not_found)
 
     save_output(graphs, "movies", movie_title)
 
-    with open(f"{OUTPUT_PATH}/movies/{movie_title}/({year}) - {movie_title}.json", 'w') as fp:
-        json.dump(json.dumps(additional_data), fp)
+    get_corpus_store(OUTPUT_PATH).put_metadata("movies", movie_title, additional_data)
+    if SAVE_GRAPH_FILES:
+        with open(f"{OUTPUT_PATH}/movies/{movie_title}/({year}) - {movie_title}.json", 'w') as fp:
+            json.dump(json.dumps(additional_data), fp)
 
 
 def get_bechdel_movies():
@@ -425,9 +485,11 @@ def get_bechdel_movies():
     generate_movies_graphs(movies)
 
 
-def get_popular_movies(resume=False):
+def get_popular_movies(resume=False, n_workers=1, retry_not_found=False):
+    # the movies casts are read from the local IMDb datasets instead of querying IMDb for every movie
+    imdb_cast_index.build()
     movies = imdb_data.get_movies_data()
-    generate_movies_graphs(movies, resume=resume)
+    generate_movies_graphs(movies, resume=resume, n_workers=n_workers, retry_not_found=retry_not_found)
 
 
 def get_best_movies():
@@ -435,28 +497,152 @@ def get_best_movies():
     generate_movies_graphs(movies)
 
 
-def generate_movies_graphs(movies_sf, overwrite=False, resume=False):
-    resume_id = 0
+def generate_movies_graphs(movies_sf, overwrite=False, resume=False, n_workers=1, max_retries=2, manifest_path=None,
+                           prefetch_threads=0, retry_not_found=False):
+    """
+    Generate the graphs of all the movies in movies_sf, each movie's result is recorded in the run manifest
+    :param movies_sf: SFrame of movies with primaryTitle, startYear & tconst columns
+    :param overwrite: regenerate movies which already have graphs
+    :param resume: skip the movies which were completed according to the run manifest
+    :param n_workers: number of worker processes, each worker keeps its own NER & spaCy models loaded
+    :param max_retries: number of times a movie that failed with an unexpected error is retried (parallel mode only)
+    :param manifest_path: path to the run manifest (default OUTPUT_PATH/movies_manifest.jsonl)
+    :param prefetch_threads: number of threads fetching the subtitles ahead of the analysis (0 - fetch during the
+    analysis)
+    :param retry_not_found: search the providers again for movies whose subtitles weren't found by previous runs, such
+    as the failed movies of a resumed run
+    :return: list of (tconst, status, error class name, elapsed seconds) tuples
+    """
+    if manifest_path is None:
+        manifest_path = f"{OUTPUT_PATH}/movies_manifest.jsonl"
+    manifest = RunManifest(manifest_path)
+    movies = movies_sf
     if resume:
-        movies_sf = movies_sf.add_row_number()
-        last_m = \
-            sorted(
-                [(f, os.path.getmtime(f"{OUTPUT_PATH}/movies/{f}")) for f in os.listdir(f"{OUTPUT_PATH}/movies/")],
-                key=lambda x: x[1])[0][0]
-        resume_id = movies_sf[movies_sf["primaryTitle"] == last_m]["id"][0]
-    for m in movies_sf[resume_id:]:
-        movie_name = m['primaryTitle'].replace('.', '').replace('/', '')
-        try:
-            if not glob.glob(f"{OUTPUT_PATH}/movies/{movie_name}/json/*{movie_name} - roles.json") or overwrite:
-                generate_movie_graph(movie_name, m["startYear"], m["tconst"].strip("t"), m)
+        movies = [m for m in movies_sf if not manifest.is_completed(m["tconst"])]
+    _warm_movies_cast_records(movies)
+    if prefetch_threads > 0:
+        movies = _prefetch_movies_subtitles(movies, prefetch_threads, manifest, retry_not_found)
+    if n_workers > 1:
+        return _generate_movies_graphs_parallel(movies, overwrite, n_workers, max_retries, manifest, retry_not_found)
+    results = []
+    for m in movies:
+        res = _generate_movie_graph_task(m, overwrite, retry_not_found)
+        manifest.record(*res)
+        results.append(res)
+    return results
+
+
+def _get_movie_video_obj(m):
+    movie_name = m['primaryTitle'].replace('.', '').replace('/', '')
+    year = m["startYear"]
+    return get_movie_obj(f"{movie_name} ({year})", movie_name, year, m["tconst"].strip("t"))
+
+
+def _warm_movies_cast_records(movies):
+    """
+    Load the cast records of the batch's first movies in one call, the worker processes inherit the loaded records
+    when they are forked
+    """
+    subtitles_path = f"{BASEPATH}/subtitles"
+    warm_cast_records(SubtitleFetcher(_get_movie_video_obj(m)).get_roles_path(subtitles_path) for m in movies)
+
+
+def _prefetch_movies_subtitles(movies, n_threads, manifest, retry_not_found=False):
+    """
+    Yield the movies once their subtitles were fetched, movies without subtitles are recorded as failed and skipped
+    """
+    videos = [(m, _get_movie_video_obj(m)) for m in movies]
+    with SubtitlePrefetcher(videos, f"{BASEPATH}/subtitles", n_threads=n_threads,
+                            retry_not_found=retry_not_found) as prefetcher:
+        for m, subtitle_info, error in prefetcher:
+            if isinstance(error, SubtitleNotFound):
+                print(f"{m['primaryTitle']} Subtitles Not Found")
+                manifest.record(m["tconst"], FAILED, type(error).__name__)
             else:
-                print(f"{movie_name} Already Exists")
-        except UnicodeEncodeError:
-            print(m["tconst"])
-        except SubtitleNotFound:
-            print(f"{movie_name} Subtitles Not Found")
-        except CastNotFound:
-            print(f"{movie_name} Cast Not Found")
+                # other fetching errors are raised again, and handled, by the movie's analysis
+                yield m
+
+
+def _generate_movies_graphs_parallel(movies, overwrite, n_workers, max_retries, manifest, retry_not_found=False):
+    results = {}
+    movies_by_id = {}
+
+    def get_tasks(movies_iter):
+        # movies are consumed lazily so the workers can start while the subtitles are still prefetched
+        for m in movies_iter:
+            movies_by_id[m["tconst"]] = m
+            yield m, overwrite, retry_not_found
+
+    pending = movies
+    pool = multiprocessing.Pool(n_workers, initializer=_init_movie_graph_worker)
+    try:
+        for _ in range(max_retries + 1):
+            retry = []
+            for res in pool.imap_unordered(_generate_movie_graph_worker, get_tasks(pending)):
+                manifest.record(*res)
+                results[res[0]] = res
+                if res[1] == ERROR:
+                    retry.append(movies_by_id[res[0]])
+            if not retry:
+                break
+            pending = retry
+    finally:
+        # terminating the pool would kill the workers before they stop their NER servers
+        pool.close()
+        pool.join()
+    return list(results.values())
+
+
+def _init_movie_graph_worker():
+    get_spacy_model(disable=SPACY_NER_DISABLE)
+    get_spacy_model(disable=SPACY_POS_DISABLE)
+    ner_pool = get_ner_pool(pool_size=1)
+    # pool workers leave through os._exit, which skips the atexit hooks, but still run the multiprocessing finalizers
+    Finalize(None, ner_pool.close, exitpriority=10)
+
+
+def _generate_movie_graph_worker(args):
+    m, overwrite, retry_not_found = args
+    start = time.time()
+    try:
+        return _generate_movie_graph_task(m, overwrite, retry_not_found)
+    except Exception as e:
+        logging.error(f"{m['primaryTitle']} - {m['tconst']}")
+        logging.error(traceback.format_exc())
+        return m["tconst"], ERROR, type(e).__name__, time.time() - start
+
+
+def _generate_movie_graph_task(m, overwrite=False, retry_not_found=False):
+    """
+    Generate a single movie's graphs, the movie's known failures are returned instead of raised
+    :param m: dict with the movie's primaryTitle, startYear & tconst
+    :param overwrite: regenerate the movie's graphs if they already exist
+    :param retry_not_found: search the providers again if the movie's subtitle wasn't found before
+    :return: tuple of (tconst, status, error class name, elapsed seconds)
+    """
+    start = time.time()
+    status, error = _generate_movie_graph_status(m, overwrite, retry_not_found)
+    return m["tconst"], status, error, time.time() - start
+
+
+def _generate_movie_graph_status(m, overwrite, retry_not_found=False):
+    movie_name = m['primaryTitle'].replace('.', '').replace('/', '')
+    try:
+        if overwrite or not (get_corpus_store(OUTPUT_PATH).get_video_ids("movies", movie_name) or
+                             import_movie_graphs(movie_name)):
+            generate_movie_graph(movie_name, m["startYear"], m["tconst"].strip("t"), m, retry_not_found)
+            return DONE, None
+        print(f"{movie_name} Already Exists")
+        return EXISTS, None
+    except UnicodeEncodeError as e:
+        print(m["tconst"])
+        return FAILED, type(e).__name__
+    except SubtitleNotFound as e:
+        print(f"{movie_name} Subtitles Not Found")
+        return FAILED, type(e).__name__
+    except CastNotFound as e:
+        print(f"{movie_name} Cast Not Found")
+        return FAILED, type(e).__name__
 
 
 def get_movies_by_character(character, overwrite=False):
@@ -502,7 +688,7 @@ def generate_actors_file():
 
         graph_path = f"{OUTPUT_PATH}/movies/{title}/"
         try:
-            if glob.glob(f"{graph_path}/*{title}.json"):
+            if get_corpus_store(OUTPUT_PATH).get_video_ids("movies", title) or import_movie_graphs(title):
                 res.append({**row, **{"path": os.path.abspath(graph_path)}})
         except:
             pass
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.cast_records` module."""
+
+import pytest
+
+from subs2network import cast_records
+from subs2network.cast_records import save_cast_record, load_cast_record, warm_cast_records, CAST_RECORD_VERSION
+from subs2network.consts import CAST_RECORD_SUFFIX
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cast_records._cast_records.clear()
+    yield
+    cast_records._cast_records.clear()
+
+
+def _get_record(imdb_id):
+    return {"version": CAST_RECORD_VERSION, "imdb_id": imdb_id, "rating": 7.0,
+            "cast": [{"id": "0000001", "name": "Actor", "order": 0, "notes": "", "roles_list": False,
+                      "roles": [{"id": None, "name": "Role", "notes": ""}]}]}
+
+
+def _save_records(path, n):
+    roles_paths = []
+    for i in range(n):
+        roles_path = str(path / f"Movie {i} (2000){CAST_RECORD_SUFFIX}")
+        save_cast_record(roles_path, _get_record(str(i)))
+        roles_paths.append(roles_path)
+    cast_records._cast_records.clear()
+    return roles_paths
+
+
+def test_warm_cast_records(tmp_path):
+    roles_paths = _save_records(tmp_path, 20)
+    missing_path = str(tmp_path / f"Missing (2000){CAST_RECORD_SUFFIX}")
+    records = warm_cast_records(roles_paths + [missing_path], n_threads=4)
+    assert records == {str(i): _get_record(str(i)) for i in range(20)}
+    # the warmed records are served from the cache
+    for p in tmp_path.iterdir():
+        p.unlink()
+    for i, roles_path in enumerate(roles_paths):
+        assert load_cast_record(roles_path) == _get_record(str(i))
+    assert load_cast_record(missing_path) is None
+
+
+def test_warm_cast_records_fills_the_cache_up_to_its_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(cast_records, "CAST_RECORDS_CACHE_SIZE", 5)
+    roles_paths = _save_records(tmp_path, 12)
+    records = warm_cast_records(iter(roles_paths))
+    assert sorted(records) == [str(i) for i in range(5)]
+    assert sorted(cast_records._cast_records) == sorted(roles_paths[:5])
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.corpus_analyzer` module."""
+
+import csv
+
+import networkx as nx
+import pytest
+
+from subs2network.corpus_analyzer import CorpusAnalyzer, Analysis
+from subs2network.corpus_store import get_corpus_store
+from subs2network.graph_binary import BinaryGraph
+
+COLUMNS = [("movie_name", str), ("graph_type", str), ("edge_number", int)]
+
+
+def binary_analysis(g):
+    yield {"movie_name": g.graph["movie_name"], "graph_type": type(g).__name__, "edge_number": len(g.src)}
+
+
+def networkx_analysis(g):
+    yield {"movie_name": g.graph["movie_name"], "graph_type": type(g).__name__, "edge_number": g.number_of_edges()}
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture
+def video_ids(tmp_path):
+    store = get_corpus_store(str(tmp_path))
+    ids = []
+    for i in range(3):
+        g = nx.path_graph([f"role {j}" for j in range(i + 2)])
+        g.graph["movie_name"] = f"movie {i}"
+        ids.append(store.put_graph(g, "movies", f"movie {i}"))
+    return ids
+
+
+def test_analyses_get_binary_or_networkx_graphs(tmp_path, video_ids):
+    analyses = {"binary": Analysis(binary_analysis, COLUMNS, binary=True),
+                "networkx": Analysis(networkx_analysis, COLUMNS)}
+    outputs = {name: str(tmp_path / f"{name}.csv") for name in analyses}
+    rows_count = CorpusAnalyzer(analyses).run(video_ids, outputs, store_output_path=str(tmp_path))
+    assert rows_count == {"binary": 3, "networkx": 3}
+    for name, graph_type in (("binary", BinaryGraph.__name__), ("networkx", nx.Graph.__name__)):
+        assert _read_csv(outputs[name]) == [{"movie_name": f"movie {i}", "graph_type": graph_type,
+                                             "edge_number": str(i + 1)} for i in range(3)]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.corpus_store` module."""
+
+import json
+import sqlite3
+
+import networkx as nx
+import pytest
+from networkx.readwrite import json_graph
+
+from subs2network.consts import VIDEO_NAME, MOVIE_YEAR
+from subs2network.corpus_store import CorpusStore, get_corpus_store
+
+
+def _get_graph(video_name, year=1972, n=4):
+    g = nx.Graph()
+    g.graph.update({VIDEO_NAME: video_name, MOVIE_YEAR: year, "imdb_rating": 9.2})
+    for i in range(n):
+        g.add_node(f"role {i}", role=f"actor {i}", first=float(i), last=float(i + 10))
+    g.nodes["role 0"]["gender"] = "F"
+    for i in range(1, n):
+        g.add_edge("role 0", f"role {i}", weight=i, first=float(i), last=float(i * 2))
+    return g
+
+
+def _assert_graphs_equal(g, expected):
+    assert g.graph == expected.graph
+    assert list(g.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(g.edges(data=True)) == list(expected.edges(data=True))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CorpusStore(str(tmp_path / "corpus.sqlite"))
+    yield store
+    store.close()
+
+
+def test_put_and_get_graph(store):
+    g = _get_graph("The Godfather")
+    g_r = _get_graph("The Godfather - roles", n=6)
+    video_ids = [store.put_graph(g, "movies", "The Godfather"), store.put_graph(g_r, "movies", "The Godfather")]
+    assert store.get_video_ids("movies", "The Godfather") == video_ids
+    _assert_graphs_equal(store.get_graph(video_ids[0]), g)
+    _assert_graphs_equal(store.get_graph(video_ids[1]), g_r)
+    _assert_graphs_equal(store.get_graph_binary(video_ids[1]).to_networkx(), g_r)
+    assert store.get_graph(video_ids[1] + 1) is None
+    assert store.get_graph_binary(video_ids[1] + 1) is None
+
+
+def test_empty_graph(store):
+    g = nx.Graph()
+    g.graph[VIDEO_NAME] = "Empty"
+    video_id = store.put_graph(g, "movies", "Empty")
+    _assert_graphs_equal(store.get_graph(video_id), g)
+    assert len(store.get_graph_binary(video_id)) == 0
+
+
+def test_rewritten_graph_replaces_the_previous_one(store):
+    video_id = store.put_graph(_get_graph("The Godfather", n=8), "movies", "The Godfather")
+    g = _get_graph("The Godfather", year=1973, n=3)
+    assert store.put_graph(g, "movies", "The Godfather") == video_id
+    _assert_graphs_equal(store.get_graph(video_id), g)
+    _assert_graphs_equal(store.get_graph_binary(video_id).to_networkx(), g)
+    assert store.get_videos() == [{"video_id": video_id, "data_type": "movies", "name": "The Godfather",
+                                   VIDEO_NAME: "The Godfather", MOVIE_YEAR: 1973}]
+    # the same video name of another output is another video
+    assert store.put_graph(g, "series", "The Godfather") != video_id
+
+
+def test_people_videos(store):
+    godfather = [store.put_graph(_get_graph(n), "movies", "The Godfather")
+                 for n in ("The Godfather", "The Godfather - roles")]
+    heat = store.put_graph(_get_graph("Heat", year=1995), "movies", "Heat")
+    store.add_person_videos("actors", "Al Pacino", godfather + [heat])
+    store.add_person_videos("actors", "Marlon Brando", godfather)
+    store.add_person_videos("directors", "Michael Mann", [heat])
+    # linking a video again is ignored
+    store.add_person_videos("actors", "Al Pacino", [heat])
+
+    assert store.get_people("actors") == ["Al Pacino", "Marlon Brando"]
+    assert store.get_people("directors") == ["Michael Mann"]
+    assert [v["video_id"] for v in store.get_videos(person_type="actors", person_name="Al Pacino")] == \
+        godfather + [heat]
+    assert [v["video_id"] for v in store.get_videos(person_type="actors", person_name="Marlon Brando")] == godfather
+    assert [v[VIDEO_NAME] for v in store.get_videos(person_type="directors", person_name="Michael Mann")] == ["Heat"]
+    assert [v["video_id"] for v in store.get_videos("movies", name="Heat")] == [heat]
+    graphs = list(store.iter_graphs(person_type="actors", person_name="Marlon Brando"))
+    assert [g.graph[VIDEO_NAME] for g in graphs] == ["The Godfather", "The Godfather - roles"]
+
+
+def test_import_json_graphs(store, tmp_path):
+    graphs = [_get_graph("Heat", year=1995), _get_graph("Heat - roles", year=1995, n=5)]
+    json_paths = []
+    for g in graphs:
+        p = tmp_path / f"(1995) - {g.graph[VIDEO_NAME]}.json"
+        p.write_text(json.dumps(json_graph.node_link_data(g)))
+        json_paths.append(str(p))
+    video_ids = store.import_json_graphs("movies", "Heat", json_paths)
+    assert store.get_video_ids("movies", "Heat") == video_ids
+    for video_id, g in zip(video_ids, graphs):
+        _assert_graphs_equal(store.get_graph(video_id), g)
+    assert store.import_json_graphs("movies", "Missing", []) == []
+
+
+def test_metadata(store):
+    assert store.get_metadata("movies", "Heat") is None
+    store.put_metadata("movies", "Heat", {"tconst": "tt0113277", "averageRating": 8.3})
+    store.put_metadata("movies", "Heat", {"tconst": "tt0113277", "averageRating": 8.2})
+    assert store.get_metadata("movies", "Heat") == {"tconst": "tt0113277", "averageRating": 8.2}
+
+
+def test_store_without_graph_binaries(tmp_path):
+    path = str(tmp_path / "corpus.sqlite")
+    store = CorpusStore(path)
+    g = _get_graph("Heat")
+    video_id = store.put_graph(g, "movies", "Heat")
+    store.close()
+    # a store written before the graphs' binary encodings were added
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE videos SET graph_binary=NULL")
+    store = CorpusStore(path)
+    _assert_graphs_equal(store.get_graph_binary(video_id).to_networkx(), g)
+    row = store._get_connection().execute("SELECT graph_binary FROM videos WHERE video_id=?", (video_id,)).fetchone()
+    assert row[0] is not None
+    store.close()
+
+
+def test_get_corpus_store_is_shared(tmp_path):
+    assert get_corpus_store(str(tmp_path / "output")) is get_corpus_store(str(tmp_path / "output"))
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.graph_analyzer` module."""
+
+import random
+
+import networkx as nx
+import pytest
+
+from subs2network.graph_analyzer import get_actor_features
+
+
+def _get_graph(n, m, seed):
+    rnd = random.Random(seed)
+    g = nx.gnm_random_graph(n, m, seed=seed)
+    g = nx.relabel_nodes(g, {v: f"actor {v}" for v in g})
+    for v, u in g.edges():
+        g.edges[v, u]["weight"] = rnd.randint(1, 10)
+    g.graph["imdb_rating"] = 7.5
+    return g
+
+
+@pytest.mark.parametrize("n, m, seed", [(2, 1, 0), (12, 20, 1), (30, 45, 2)])
+def test_get_actor_features(n, m, seed):
+    g = _get_graph(n, m, seed)
+    for actor in ("actor 0", f"actor {n - 1}"):
+        expected = {"total_weight": g.degree(actor, weight="weight"), "degree": g.degree(actor),
+                    "closeness": nx.closeness_centrality(g)[actor],
+                    "betweenness": nx.betweenness_centrality(g)[actor],
+                    "betweenness_weight": nx.betweenness_centrality(g, weight="weight")[actor],
+                    "degree_centrality": nx.degree_centrality(g)[actor], "clustering": nx.clustering(g)[actor],
+                    "movie_rating": 7.5, "pagerank": nx.pagerank(g, weight=None)[actor],
+                    "pagerank_weight": nx.pagerank(g)[actor]}
+        res = get_actor_features(g, actor)
+        assert set(res) == set(expected)
+        for k, v in expected.items():
+            assert res[k] == pytest.approx(v, abs=1e-6), k
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.graph_binary` module."""
+
+import os
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from subs2network.graph_binary import dumps_graph_binary, loads_graph_binary, save_graph_binary, load_graph_binary, \
+    load_graph, get_graph_binary_path
+
+
+def _get_graph():
+    g = nx.Graph(movie_name="The Godfather - roles", movie_year=1972, imdb_rating=9.2)
+    g.add_node("Michael Corleone", role="Al Pacino", gender="M", first=1.5, last=9000.25)
+    g.add_node("Kay Adams", role="Diane Keaton", gender="F", first=3, last=8000)
+    # missing attributes and a None category
+    g.add_node("Sonny Corleone", role="James Caan", gender=None)
+    g.add_node("Tom Hagen")
+    g.add_edge("Michael Corleone", "Kay Adams", weight=12, first=3.0, last=7000.5)
+    g.add_edge("Michael Corleone", "Sonny Corleone", weight=4, first=20.0)
+    g.add_edge("Kay Adams", "Tom Hagen", weight=2.5)
+    g.add_edge("Tom Hagen", "Tom Hagen", weight=1)
+    return g
+
+
+def _assert_graphs_equal(g, expected):
+    assert g.graph == expected.graph
+    assert list(g.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(g.edges(data=True)) == list(expected.edges(data=True))
+
+
+def test_round_trip():
+    g = _get_graph()
+    _assert_graphs_equal(loads_graph_binary(dumps_graph_binary(g)).to_networkx(), g)
+
+
+def test_empty_graph():
+    g = nx.Graph(movie_name="Empty")
+    bg = loads_graph_binary(dumps_graph_binary(g))
+    assert len(bg) == 0 and len(bg.src) == 0 and len(bg.dst) == 0
+    _assert_graphs_equal(bg.to_networkx(), g)
+
+
+def test_columns():
+    bg = loads_graph_binary(dumps_graph_binary(_get_graph()))
+    assert bg.nodes == ["Michael Corleone", "Kay Adams", "Sonny Corleone", "Tom Hagen"]
+    assert bg.src.tolist() == [0, 0, 1, 3] and bg.dst.tolist() == [1, 2, 3, 3]
+    # categorical columns are codes of their categories, -1 for missing values
+    assert bg.get_categories("gender") == ["M", "F", None]
+    assert bg.nodes_columns["gender"].tolist() == [0, 1, 2, -1]
+    assert bg.get_values("gender", missing="?") == ["M", "F", None, "?"]
+    # numeric columns with missing values are float with NaN
+    assert bg.nodes_columns["first"].dtype == np.float64
+    assert bg.get_values("first") == [1.5, 3, None, None]
+    assert bg.edges_columns["weight"].dtype == np.float64
+    assert bg.get_values("last", "edges") == [7000.5, None, None, None]
+    assert bg.get_categories("weight", "edges") is None
+
+
+def test_integer_columns():
+    g = nx.Graph()
+    g.add_edge(1, 2, weight=3)
+    g.add_edge(2, 3, weight=5)
+    bg = loads_graph_binary(dumps_graph_binary(g))
+    assert bg.edges_columns["weight"].dtype == np.int64
+    _assert_graphs_equal(bg.to_networkx(), g)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_save_and_load(tmp_path, use_mmap):
+    g = _get_graph()
+    path = str(tmp_path / "graph.s2ng")
+    save_graph_binary(g, path)
+    assert os.listdir(str(tmp_path)) == ["graph.s2ng"]
+    _assert_graphs_equal(load_graph_binary(path, use_mmap).to_networkx(), g)
+
+
+def test_load_graph_prefers_an_up_to_date_binary(tmp_path):
+    g = _get_graph()
+    json_path = tmp_path / "json" / "graph.json"
+    json_path.parent.mkdir()
+    json_path.write_text('{"directed": false, "multigraph": false, "graph": {}, "nodes": [{"id": "a"}], '
+                         '"links": []}')
+    assert list(load_graph(str(json_path)).nodes()) == ["a"]
+    binary_path = get_graph_binary_path(str(json_path))
+    os.makedirs(os.path.dirname(binary_path))
+    save_graph_binary(g, binary_path)
+    _assert_graphs_equal(load_graph(str(json_path)), g)
+    assert load_graph(str(json_path), as_binary=True).nodes == list(g.nodes())
+
+
+def test_not_a_binary_graph():
+    with pytest.raises(ValueError):
+        loads_graph_binary(b"JSON" + bytes(32))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.graph_features` module."""
+
+import random
+
+import networkx as nx
+import pytest
+
+from subs2network.graph_binary import dumps_graph_binary, loads_graph_binary
+from subs2network.graph_features import GraphFeatures, get_pivots_number, iter_triangles, clique_number, \
+    clique_number_bounds
+
+
+def _get_graph(n, m, seed):
+    rnd = random.Random(seed)
+    g = nx.gnm_random_graph(n, m, seed=seed)
+    g = nx.relabel_nodes(g, {v: f"role {v}" for v in g})
+    for v, u in g.edges():
+        g.edges[v, u]["weight"] = rnd.randint(1, 10)
+    return g
+
+
+@pytest.fixture(params=[(1, 0), (2, 1), (10, 12), (30, 60), (40, 30), (25, 150)])
+def graph(request):
+    n, m = request.param
+    return _get_graph(n, m, seed=n + m)
+
+
+def _assert_equal(values, expected):
+    assert set(values) == set(expected)
+    for v in expected:
+        assert values[v] == pytest.approx(expected[v], abs=1e-6)
+
+
+def test_closeness(graph):
+    features = GraphFeatures(graph)
+    _assert_equal(features.to_dict(features.closeness()), nx.closeness_centrality(graph))
+
+
+def test_betweenness(graph):
+    features = GraphFeatures(graph)
+    _assert_equal(features.to_dict(features.betweenness()), nx.betweenness_centrality(graph))
+
+
+def test_pagerank(graph):
+    features = GraphFeatures(graph)
+    _assert_equal(features.to_dict(features.pagerank(weight=None)), nx.pagerank(graph, weight=None))
+    _assert_equal(features.to_dict(features.pagerank(weight="weight")), nx.pagerank(graph, weight="weight"))
+
+
+def test_clustering(graph):
+    features = GraphFeatures(graph)
+    _assert_equal(features.to_dict(features.clustering()), nx.clustering(graph))
+    _assert_equal(features.to_dict(features.clustering(weight="weight")), nx.clustering(graph, weight="weight"))
+    assert features.average_clustering() == pytest.approx(nx.average_clustering(graph))
+
+
+def test_self_loops():
+    g = _get_graph(15, 30, seed=0)
+    g.add_edge("role 0", "role 0", weight=3)
+    features = GraphFeatures(g)
+    _assert_equal(features.to_dict(features.betweenness()), nx.betweenness_centrality(g))
+    _assert_equal(features.to_dict(features.pagerank(weight="weight")), nx.pagerank(g, weight="weight"))
+
+
+def test_empty_graph():
+    features = GraphFeatures(nx.Graph())
+    assert len(features.closeness()) == 0
+    assert len(features.betweenness()) == 0
+    with pytest.raises(ZeroDivisionError):
+        features.average_clustering()
+
+
+@pytest.mark.parametrize("n, m, seed", [(300, 900, 0), (400, 3000, 1)])
+def test_sampled_centralities(n, m, seed):
+    g = _get_graph(n, m, seed)
+    epsilon = 0.2
+    k = get_pivots_number(n, epsilon)
+    features = GraphFeatures(g, k=k, seed=seed)
+    assert features.is_sampled
+    closeness = nx.closeness_centrality(g)
+    betweenness = nx.betweenness_centrality(g)
+    for v, c in features.to_dict(features.closeness()).items():
+        assert c == pytest.approx(closeness[v], abs=epsilon)
+    for v, b in features.to_dict(features.betweenness()).items():
+        assert b == pytest.approx(betweenness[v], abs=epsilon)
+
+
+def test_sampled_centralities_are_seeded():
+    g = _get_graph(200, 600, seed=0)
+    features = GraphFeatures(g, k=50, seed=1)
+    same_seed = GraphFeatures(g, k=50, seed=1)
+    other_seed = GraphFeatures(g, k=50, seed=2)
+    assert (features.closeness() == same_seed.closeness()).all()
+    assert (features.betweenness() == same_seed.betweenness()).all()
+    assert not (features.closeness() == other_seed.closeness()).all()
+
+
+def test_from_graph_samples_above_threshold(graph):
+    assert not GraphFeatures.from_graph(graph, sampling_threshold=None).is_sampled
+    assert not GraphFeatures.from_graph(graph, sampling_threshold=len(graph)).is_sampled
+    features = GraphFeatures.from_graph(graph, sampling_threshold=len(graph) - 1, epsilon=0.5, seed=0)
+    assert features.is_sampled == (get_pivots_number(len(graph), 0.5) < len(graph))
+    if not features.is_sampled:
+        _assert_equal(features.to_dict(features.closeness()), nx.closeness_centrality(graph))
+
+
+def _assert_triangles(g):
+    triangles = list(iter_triangles(g))
+    assert len({frozenset(t) for t in triangles}) == len(triangles)
+    assert {frozenset(t) for t in triangles} == {frozenset(c) for c in nx.enumerate_all_cliques(g) if len(c) == 3}
+    counts = {v: 0 for v in g}
+    for t in triangles:
+        for v in t:
+            counts[v] += 1
+    assert counts == nx.triangles(g)
+
+
+def test_iter_triangles(graph):
+    _assert_triangles(graph)
+
+
+def test_iter_triangles_self_loops():
+    g = _get_graph(20, 80, seed=1)
+    g.add_edges_from([("role 0", "role 0"), ("role 1", "role 1")])
+    _assert_triangles(g)
+
+
+def test_iter_triangles_complete_graph():
+    g = nx.complete_graph(7)
+    assert len(list(iter_triangles(g))) == 35
+    _assert_triangles(g)
+
+
+def _get_clique_number(g):
+    return max((len(c) for c in nx.find_cliques(g)), default=0)
+
+
+@pytest.mark.parametrize("n, m, seed", [(1, 0, 0), (10, 12, 0), (30, 60, 1), (30, 300, 2), (60, 1200, 3)])
+def test_clique_number(n, m, seed):
+    g = _get_graph(n, m, seed)
+    g.add_edge("role 0", "role 0")
+    expected = _get_clique_number(g)
+    lower, upper = clique_number_bounds(g)
+    assert lower <= expected <= upper
+    assert clique_number(g) == (expected, expected, True)
+    assert clique_number(g, time_budget=None, node_budget=None) == (expected, expected, True)
+
+
+def test_clique_number_empty_graph():
+    assert clique_number_bounds(nx.Graph()) == (0, 0)
+    assert clique_number(nx.Graph()) == (0, 0, True)
+
+
+@pytest.mark.parametrize("g", [nx.cycle_graph(5), nx.mycielski_graph(4), nx.mycielski_graph(5)])
+def test_clique_number_budget_returns_bounds(g):
+    # triangle free graphs whose coloring and degeneracy bounds are loose
+    lower, upper = clique_number_bounds(g)
+    assert lower < upper
+    assert clique_number(g, node_budget=0) == (lower, upper, False)
+    # the time budget is already exhausted after the first maximal clique
+    assert clique_number(g, time_budget=-1) == (lower, upper, False)
+    assert clique_number(g) == (2, 2, True)
+
+
+def test_binary_graph(graph):
+    g = graph.copy()
+    if len(g) > 1:
+        g.add_edge("role 0", "role 0", weight=2)
+        g.add_edge("role 0", "role 1")
+    bg = loads_graph_binary(dumps_graph_binary(g))
+    features = GraphFeatures(g)
+    binary_features = GraphFeatures(bg)
+    assert binary_features.nodes == features.nodes
+    assert (binary_features.closeness() == features.closeness()).all()
+    assert (binary_features.betweenness() == features.betweenness()).all()
+    assert (binary_features.pagerank(weight="weight") == features.pagerank(weight="weight")).all()
+    assert (binary_features.clustering(weight="weight") == features.clustering(weight="weight")).all()
+    assert list(iter_triangles(bg)) == list(iter_triangles(g))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.subtitle_analyzer` module."""
+
+import random
+from functools import total_ordering
+
+import networkx as nx
+import pytest
+
+from subs2network.consts import IMDB_NAME
+from subs2network.subtitle_analyzer import SubtitleAnalyzer, RolesTimeline
+
+ROLES = [("Marlon Brando", "Don Vito Corleone"), ("Al Pacino", "Michael Corleone"), ("James Caan", "Sonny Corleone"),
+         ("Robert Duvall", "Tom Hagen"), ("Diane Keaton", "Kay Adams"), ("Talia Shire", "Connie Corleone"),
+         ("John Cazale", "Fredo Corleone"), ("Richard Castellano", "Clemenza"),
+         # an actor with two roles is a self loop in the actors graph
+         ("Al Pacino", "Young Michael")]
+
+
+@total_ordering
+class Entity(object):
+    """
+    Minimal stand in for the imdb Person objects the timeline's roles are made of
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getitem__(self, key):
+        assert key == IMDB_NAME
+        return self.name
+
+    def __eq__(self, other):
+        return self.name == other.name
+
+    def __lt__(self, other):
+        return self.name < other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __str__(self):
+        return self.name
+
+
+def _get_analyzer(timeline):
+    sa = SubtitleAnalyzer.__new__(SubtitleAnalyzer)
+    sa._roles_timeline = RolesTimeline()
+    for t, roles in timeline:
+        sa._roles_timeline.add(t, {(Entity(a), Entity(r)) for a, r in roles})
+    return sa
+
+
+def _get_random_analyzer(seed, n=300):
+    rnd = random.Random(seed)
+    timeline = []
+    t = 0
+    for _ in range(n):
+        # repeated timestamps are kept as separate mentions
+        t += rnd.choice((0, rnd.randint(1, 5000), rnd.randint(1, 60000)))
+        timeline.append((t, rnd.sample(ROLES, rnd.choice((1, 1, 2, 3)))))
+    rnd.shuffle(timeline)
+    return _get_analyzer(timeline)
+
+
+def _update_appearances(graphs, roles, t):
+    for i, g in enumerate(graphs):
+        for role in roles:
+            r = role[i][IMDB_NAME]
+            if r in g.nodes:
+                g.nodes[r]["last"] = t / 1000
+            else:
+                g.add_node(r, first=t / 1000, last=t / 1000, role=role[1 - i][IMDB_NAME])
+
+
+def _update_interaction(graphs, roles, t):
+    for i, g in enumerate(graphs):
+        for role in roles:
+            v, u = role[0][i][IMDB_NAME], role[1][i][IMDB_NAME]
+            if (v, u) in g.edges:
+                g.adj[v][u]["last"] = t / 1000
+                g.adj[v][u]["weight"] += 1
+            else:
+                g.add_edge(v, u, first=t / 1000, last=t / 1000, weight=1)
+
+
+def _get_links_per_window(sa, timelaps_seconds):
+    """
+    The per-window loop the sweep replaced, updating the graphs for each pair of mentions inside the window
+    """
+    timeline = list(sa._roles_timeline)
+    graphs = [nx.Graph(), nx.Graph()]
+    for i, (t1, entities1) in enumerate(timeline):
+        _update_appearances(graphs, entities1, t1)
+        if len(entities1) > 1:
+            _update_interaction(graphs, sa._get_edges(entities1, entities1), t1)
+        for t2, entities2 in timeline[i + 1:]:
+            if t2 - t1 >= timelaps_seconds * 1000:
+                break
+            _update_appearances(graphs, entities1, t1)
+            _update_appearances(graphs, entities2, t2)
+            _update_interaction(graphs, sa._get_edges(entities1, entities2), t2)
+    return graphs
+
+
+def _assert_graphs_equal(graphs, expected):
+    assert len(graphs) == len(expected)
+    for g, e in zip(graphs, expected):
+        assert list(g.nodes(data=True)) == list(e.nodes(data=True))
+        assert list(g.edges(data=True)) == list(e.edges(data=True))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_windows_sweep_matches_per_window_loop(seed):
+    sa = _get_random_analyzer(seed)
+    windows = [60, 1, 5, 30, 5]
+    res = sa.get_subtitles_entities_links_windows(windows)
+    assert sorted(res) == [1, 5, 30, 60]
+    for w in windows:
+        expected = _get_links_per_window(sa, w)
+        assert expected[1].number_of_edges() > 0
+        _assert_graphs_equal(res[w], expected)
+        _assert_graphs_equal(sa.get_subtitles_entities_links(w), expected)
+
+
+def test_window_is_exclusive():
+    sa = _get_analyzer([(0, [ROLES[0]]), (10000, [ROLES[1]]), (19999, [ROLES[2]])])
+    res = sa.get_subtitles_entities_links_windows([10, 11])
+    assert list(res[10][1].edges()) == [("Michael Corleone", "Sonny Corleone")]
+    assert sorted(tuple(sorted(e)) for e in res[11][1].edges()) == [("Don Vito Corleone", "Michael Corleone"),
+                                                                     ("Michael Corleone", "Sonny Corleone")]
+    for w in (10, 11):
+        _assert_graphs_equal(res[w], _get_links_per_window(sa, w))
+
+
+def test_no_windows():
+    assert _get_random_analyzer(0, n=10).get_subtitles_entities_links_windows([]) == {}
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.subtitle_prefetcher` module."""
+
+import threading
+import time
+
+from subs2network import subtitle_prefetcher
+from subs2network.exceptions import SubtitleNotFound
+from subs2network.subtitle_prefetcher import SubtitlePrefetcher, RateLimiter
+
+PROVIDER = "stub"
+
+
+class StubProvider(object):
+    """
+    Offline subtitles provider, the videos are dicts with the download delay and the error the download raises
+    """
+
+    def __init__(self):
+        self.downloads = []
+        self._lock = threading.Lock()
+
+    def download(self, video):
+        time.sleep(video.get("delay", 0))
+        with self._lock:
+            self.downloads.append((video["name"], time.monotonic()))
+        if video.get("error") is not None:
+            raise video["error"]
+        return {"video_name": video["name"]}
+
+
+def get_fetcher_cls(provider, fetched=(), not_found=()):
+    class StubFetcher(object):
+        def __init__(self, video_obj, providers=None, provider_configs=None):
+            self._video_obj = video_obj
+
+        def is_fetched(self, path):
+            return self._video_obj["name"] in fetched
+
+        def is_not_found(self, path):
+            return self._video_obj["name"] in not_found
+
+        def fetch_subtitle(self, path, retry_not_found=False):
+            if not retry_not_found and self.is_not_found(path):
+                raise SubtitleNotFound
+            if self.is_fetched(path):
+                return {"video_name": self._video_obj["name"]}
+            return provider.download(self._video_obj)
+
+    return StubFetcher
+
+
+def _get_videos(n, **kwargs):
+    return [(i, dict(name=f"video {i}", **kwargs)) for i in range(n)]
+
+
+def test_fetches_all_videos():
+    provider = StubProvider()
+    videos = _get_videos(20)
+    with SubtitlePrefetcher(videos, "subtitles", n_threads=4, providers=[PROVIDER],
+                            rate_limiter=RateLimiter(0), fetcher_cls=get_fetcher_cls(provider)) as prefetcher:
+        res = list(prefetcher)
+    assert sorted(key for key, d, error in res) == list(range(20))
+    assert all(error is None and d == {"video_name": f"video {key}"} for key, d, error in res)
+
+
+def test_single_thread_keeps_the_videos_order():
+    provider = StubProvider()
+    with SubtitlePrefetcher(_get_videos(10), "subtitles", n_threads=1, providers=[PROVIDER],
+                            rate_limiter=RateLimiter(0), fetcher_cls=get_fetcher_cls(provider)) as prefetcher:
+        assert [key for key, d, error in prefetcher] == list(range(10))
+
+
+def test_videos_are_yielded_as_they_complete():
+    provider = StubProvider()
+    videos = [(0, {"name": "slow", "delay": 0.5}), (1, {"name": "fast"})]
+    with SubtitlePrefetcher(videos, "subtitles", n_threads=2, providers=[PROVIDER],
+                            rate_limiter=RateLimiter(0), fetcher_cls=get_fetcher_cls(provider)) as prefetcher:
+        assert [key for key, d, error in prefetcher] == [1, 0]
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+
+
+def test_rate_limiter_reserves_spaced_calls(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(subtitle_prefetcher, "time", clock)
+    limiter = RateLimiter(2)
+    for _ in range(3):
+        limiter.wait(PROVIDER)
+    limiter.wait("other")
+    assert clock.sleeps == [2, 4]
+    clock.now += 10
+    limiter.wait(PROVIDER)
+    assert clock.sleeps == [2, 4]
+
+
+def test_rate_limiting():
+    provider = StubProvider()
+    min_interval = 0.05
+    start = time.monotonic()
+    with SubtitlePrefetcher(_get_videos(8), "subtitles", n_threads=4, providers=[PROVIDER],
+                            rate_limiter=RateLimiter(min_interval),
+                            fetcher_cls=get_fetcher_cls(provider)) as prefetcher:
+        list(prefetcher)
+    assert len(provider.downloads) == 8
+    # the last of the 8 calls is reserved at least 7 intervals after the first
+    assert max(t for name, t in provider.downloads) - start >= 7 * min_interval
+
+
+def test_fetched_videos_are_not_rate_limited():
+    provider = StubProvider()
+    videos = _get_videos(5)
+    start = time.monotonic()
+    fetcher_cls = get_fetcher_cls(provider, fetched={v["name"] for key, v in videos})
+    with SubtitlePrefetcher(videos, "subtitles", n_threads=1, providers=[PROVIDER], rate_limiter=RateLimiter(1),
+                            fetcher_cls=fetcher_cls) as prefetcher:
+        assert len(list(prefetcher)) == 5
+    assert time.monotonic() - start < 1
+    assert provider.downloads == []
+
+
+def test_errors_are_propagated():
+    provider = StubProvider()
+    videos = _get_videos(6)
+    videos[2][1]["error"] = SubtitleNotFound()
+    videos[4][1]["error"] = ValueError("bad subtitle")
+    with SubtitlePrefetcher(videos, "subtitles", n_threads=3, providers=[PROVIDER],
+                            rate_limiter=RateLimiter(0), fetcher_cls=get_fetcher_cls(provider)) as prefetcher:
+        res = {key: (d, error) for key, d, error in prefetcher}
+    assert len(res) == 6
+    assert res[2][0] is None and isinstance(res[2][1], SubtitleNotFound)
+    assert res[4][0] is None and isinstance(res[4][1], ValueError)
+    assert all(res[key][1] is None for key in (0, 1, 3, 5))
+
+
+def test_close_before_consuming_all_videos():
+    provider = StubProvider()
+    prefetcher = SubtitlePrefetcher(_get_videos(100), "subtitles", n_threads=2, queue_size=2, providers=[PROVIDER],
+                                    rate_limiter=RateLimiter(0), fetcher_cls=get_fetcher_cls(provider))
+    with prefetcher:
+        for key, d, error in prefetcher:
+            break
+    assert len(provider.downloads) < 100
+
+
+def test_not_found_videos_are_not_searched_again():
+    provider = StubProvider()
+    videos = _get_videos(4)
+    fetcher_cls = get_fetcher_cls(provider, not_found={"video 1", "video 3"})
+    with SubtitlePrefetcher(videos, "subtitles", n_threads=1, providers=[PROVIDER], rate_limiter=RateLimiter(0),
+                            fetcher_cls=fetcher_cls) as prefetcher:
+        res = {key: error for key, d, error in prefetcher}
+    assert isinstance(res[1], SubtitleNotFound) and isinstance(res[3], SubtitleNotFound)
+    assert sorted(name for name, t in provider.downloads) == ["video 0", "video 2"]
+
+
+def test_retry_not_found_videos():
+    provider = StubProvider()
+    videos = _get_videos(4)
+    fetcher_cls = get_fetcher_cls(provider, not_found={"video 1", "video 3"})
+    with SubtitlePrefetcher(videos, "subtitles", n_threads=1, providers=[PROVIDER], rate_limiter=RateLimiter(0),
+                            fetcher_cls=fetcher_cls, retry_not_found=True) as prefetcher:
+        assert all(error is None for key, d, error in prefetcher)
+    assert sorted(name for name, t in provider.downloads) == [f"video {i}" for i in range(4)]
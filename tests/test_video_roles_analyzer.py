@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `subs2network.video_roles_analyzer` module."""
+
+import random
+
+import pytest
+from fuzzywuzzy import process
+
+pytest.importorskip("rapidfuzz")
+
+from subs2network.video_roles_analyzer import extract_best_match
+
+ROLES_NAMES = ["Harry Potter", "Hermione Granger", "Ron Weasley", "Albus Dumbledore", "Severus Snape",
+               "Rubeus Hagrid", "Draco Malfoy", "Minerva McGonagall", "Lord Voldemort", "Sirius Black",
+               "Remus Lupin", "Ginny Weasley", "Fred Weasley", "George Weasley", "Neville Longbottom",
+               "Luna Lovegood", "Vernon Dursley", "Petunia Dursley", "Dudley Dursley", "Dobby",
+               "Bellatrix Lestrange", "Cho Chang", "Cedric Diggory", "Mad-Eye Moody", "Mr. Ollivander",
+               "Zoë Hart", "Renée", "José Luis", "Dr. Watson", "Sherlock Holmes", "Mrs. Hudson",
+               "Inspector Lestrade", "Jim Moriarty", "Molly Hooper", "Mycroft Holmes", "Irene Adler"]
+
+
+def _mutate(name, rnd):
+    chars = list(name)
+    for _ in range(rnd.randint(0, 3)):
+        i = rnd.randrange(len(chars))
+        op = rnd.choice(("delete", "replace", "insert"))
+        if op == "delete" and len(chars) > 1:
+            del chars[i]
+        elif op == "replace":
+            chars[i] = rnd.choice("abcdefghijklmnopqrstuvwxyz ")
+        else:
+            chars.insert(i, rnd.choice("abcdefghijklmnopqrstuvwxyz "))
+    return "".join(chars)
+
+
+def _get_queries():
+    rnd = random.Random(0)
+    queries = ROLES_NAMES + [n.split()[0] for n in ROLES_NAMES] + [n.split()[-1] for n in ROLES_NAMES]
+    queries += [_mutate(rnd.choice(ROLES_NAMES), rnd) for _ in range(2000)]
+    return queries
+
+
+def test_extract_best_match_agrees_with_fuzzywuzzy():
+    rnd = random.Random(1)
+    for query in _get_queries():
+        choices = rnd.sample(ROLES_NAMES, 10)
+        for score_cutoff in (80, 90):
+            expected = process.extractOne(query, choices, score_cutoff=score_cutoff)
+            expected = expected[0] if expected is not None else None
+            assert extract_best_match(query, choices, score_cutoff) == expected, query
+
+
+def test_extract_best_match_no_choices():
+    assert extract_best_match("Harry", []) is None